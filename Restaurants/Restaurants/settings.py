@@ -48,6 +48,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'Restaurants_api',
     'rest_framework',
     'rest_framework.authtoken',
@@ -59,6 +60,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'Restaurants_api.middleware.RequestProfilingMiddleware',
+    'Restaurants_api.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -69,6 +72,33 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Server-Timing header and a JSON log line per request (see Restaurants_api/middleware.py)
+REQUEST_PROFILING = os.getenv('REQUEST_PROFILING', 'False') == 'True'
+
+# Per-route request metrics, summed across worker processes through METRICS_DIR (a directory they
+# share, one per deployment) and served at /metrics; on when METRICS_DIR is set
+METRICS_DIR = os.getenv('METRICS_DIR')
+REQUEST_METRICS = os.getenv('REQUEST_METRICS', str(bool(METRICS_DIR))) == 'True'
+
+# Live order events over SSE (see Restaurants_api/order_stream.py): how often each worker polls for events written
+# elsewhere, the keep-alive comment interval, how long a stream stays open before the client reconnects, and the
+# sync threads (each with its own database connection) that streams share for their setup (see Restaurants_api/asgi.py)
+ORDER_STREAM_POLL_INTERVAL = float(os.getenv('ORDER_STREAM_POLL_INTERVAL', 0.5))
+ORDER_STREAM_KEEPALIVE = int(os.getenv('ORDER_STREAM_KEEPALIVE', 15))
+ORDER_STREAM_MAX_AGE = int(os.getenv('ORDER_STREAM_MAX_AGE', 3600))
+ORDER_STREAM_SYNC_THREADS = int(os.getenv('ORDER_STREAM_SYNC_THREADS', 4))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'Restaurants_api.profiling': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 ROOT_URLCONF = 'Restaurants.urls'
 
 TEMPLATES = [
@@ -109,6 +139,58 @@ else:
     }
 
 
+# Caches
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# 'catalogue' holds rendered-ready data for the public menu/category endpoints.
+# Point both at a shared backend (Redis/Memcached) when running several workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalogue': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'catalogue',
+        'TIMEOUT': int(os.getenv('CATALOGUE_CACHE_TIMEOUT', 60)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CATALOGUE_CACHE_MAX_ENTRIES', 1000)),
+        },
+    },
+    # Token-to-user and user lookups, roles and JWT token versions (see auth_cache.py). Deleted
+    # tokens, deactivated users and lost roles are dropped from it at once only where it is
+    # shared, so a worker-local copy keeps entries for seconds
+    'auth': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_URL'),
+        'KEY_PREFIX': 'auth',
+        'TIMEOUT': int(os.getenv('AUTH_CACHE_TIMEOUT', 300)),
+    } if os.getenv('REDIS_URL') else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'auth',
+        'TIMEOUT': int(os.getenv('AUTH_CACHE_TIMEOUT', 5)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('AUTH_CACHE_MAX_ENTRIES', 10000)),
+        },
+    },
+    # Rate-limit buckets: share them through Redis when running several workers
+    'throttle': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_URL'),
+    } if os.getenv('REDIS_URL') else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'throttle',
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    },
+}
+
+
+AUTHENTICATION_BACKENDS = [
+    'Restaurants_api.authentication.CachedModelBackend',
+]
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -156,34 +238,52 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # Token, session or JWT authentication, picked from the Authorization scheme or session cookie
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        'rest_framework.authentication.TokenAuthentication',
-        'rest_framework.authentication.SessionAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'Restaurants_api.authentication.SchemeAuthentication',
     ),
 
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'Restaurants_api.renderers.FastJSONRenderer',     # JSONRenderer output, rendered with orjson
         'rest_framework.renderers.BrowsableAPIRenderer',
         'rest_framework_xml.renderers.XMLRenderer',
+        'Restaurants_api.renderers.MessagePackRenderer',
+    ],
+
+    'DEFAULT_PARSER_CLASSES': [
+        'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+        'Restaurants_api.parsers.MessagePackParser',
     ],
 
     # 'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     # 'PAGE_SIZE': 10, 
     
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.UserRateThrottle',
-        'rest_framework.throttling.AnonRateThrottle',
+        'Restaurants_api.throttles.GCRAThrottle',
     ],
 
     'DEFAULT_THROTTLE_RATES': {
         'anon': '4/minute',
         'user': '10/minute',
+        'menu': '120/minute',       # cached public menu reads, per user or IP
+        'checkout': '3/minute',     # placing orders
         # 'ten': '10/minute',
     },
     
 }
 
+SIMPLE_JWT = {
+    # Access tokens carry the user's roles (see Restaurants_api/tokens.py)
+    'TOKEN_OBTAIN_SERIALIZER': 'Restaurants_api.tokens.RoleTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'Restaurants_api.tokens.RoleTokenRefreshSerializer',
+    'TOKEN_BLACKLIST_SERIALIZER': 'Restaurants_api.tokens.RoleTokenBlacklistSerializer',
+}
+
+# Seconds between checks for tokens other workers have blacklisted (0: every token)
+BLACKLIST_FILTER_INTERVAL = float(os.getenv('BLACKLIST_FILTER_INTERVAL', 1.0))
+
 DJOSER = {
     'USER_ID_FIELD': 'username'
 }
@@ -19,6 +19,7 @@ from django.urls import path, include
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
+from Restaurants_api.views import MetricsView
 
 schema_view = get_schema_view(
     openapi.Info(
@@ -39,6 +40,7 @@ urlpatterns = [
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
     path('swagger.json', schema_view.without_ui(cache_timeout=0), name='schema-json'),
     path('admin/', admin.site.urls), 
+    path('metrics', MetricsView.as_view(), name='metrics'),
     path('api/',include('Restaurants_api.urls')), 
     path('auth/', include('djoser.urls')), 
     path('auth/', include('djoser.urls.authtoken')), 
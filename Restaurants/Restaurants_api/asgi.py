@@ -0,0 +1,49 @@
+"""
+The project's ASGI handler (used by Restaurants/asgi.py).
+
+Django gives each request a ThreadSensitiveContext, so its sync work (signal
+receivers, cache and ORM calls from async code) runs on a thread of its own,
+kept, with its database connection, until the response finishes. For
+long-lived responses that is a parked thread per open connection, so the
+routes named in LONG_LIVED share a fixed set of ORDER_STREAM_SYNC_THREADS
+contexts instead, handed out in turn: a slow call holds up only the requests
+on its thread, and however many streams are open their sync work never needs
+more threads, or database connections, than that. Their views only touch the
+database while a connection is being set up.
+"""
+
+from itertools import cycle
+
+import django
+from asgiref.sync import SyncToAsync, ThreadSensitiveContext
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler as DjangoASGIHandler
+from django.urls import reverse
+
+
+LONG_LIVED = ('async_order_stream',)
+
+
+class ASGIHandler(DjangoASGIHandler):
+    def __init__(self):
+        super().__init__()
+        self.long_lived_paths = frozenset(reverse(name) for name in LONG_LIVED)
+        # Never entered, so never shut down: each keeps its thread for the life of the process
+        self.shared_contexts = [ThreadSensitiveContext() for _ in range(settings.ORDER_STREAM_SYNC_THREADS)]
+        self.next_context = cycle(self.shared_contexts)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['path'] in self.long_lived_paths:
+            # What `async with ThreadSensitiveContext()` does, minus the shutdown on exit
+            token = SyncToAsync.thread_sensitive_context.set(next(self.next_context))
+            try:
+                await self.handle(scope, receive, send)
+            finally:
+                SyncToAsync.thread_sensitive_context.reset(token)
+        else:
+            await super().__call__(scope, receive, send)
+
+
+def get_asgi_application():
+    django.setup(set_prefix=False)
+    return ASGIHandler()
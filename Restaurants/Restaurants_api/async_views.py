@@ -0,0 +1,261 @@
+"""
+Async (ASGI-native) read endpoints.
+
+Mirrors the GET side of the DRF views in views.py with the async ORM, so a
+single ASGI worker can keep many slow clients in flight without a thread per
+request. Output is rendered with DRF's JSONRenderer (or MessagePackRenderer, by
+Accept header) and matches the sync endpoints byte for byte (apart from the /async/ prefix in pagination links). Writes stay on the DRF views.
+"""
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.mediatypes import media_type_matches, order_by_precedence
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .authentication import SchemeAuthentication
+from . import order_stream
+from .menu_filters import MenuItemFilter
+from .models import MenuItem, Category, Cart, Order
+from .renderers import MessagePackRenderer
+from .roles import MANAGER, DELIVERY_CREW, aget_roles
+from .search import MenuItemSearchFilter, RankOrderingFilter, search_menu_items
+from .serializers import MenuItemSerializer, CategorySerializer, CartSerializer, OrderSerializer
+
+
+"""  Base view  """
+class AsyncReadView(View):
+    http_method_names = ['get']
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
+    requires_authentication = False
+    renderers = [JSONRenderer(), MessagePackRenderer()]
+    renderer = renderers[0]
+    authentication = SchemeAuthentication()
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            self.renderer = self.select_renderer(request)
+            try:
+                request.user = await self.authentication.aauthenticate(request)
+            except exceptions.AuthenticationFailed:
+                request.user = AnonymousUser()
+                raise
+            if self.requires_authentication and not request.user.is_authenticated:
+                raise exceptions.NotAuthenticated()
+            if not await self.has_permission(request):
+                raise exceptions.PermissionDenied()
+            # Throttles hit the cache (Redis, or LocMem under a lock): keep that off the event loop.
+            # No ORM, so they need not wait for the thread the ORM calls share.
+            await sync_to_async(self.check_throttles, thread_sensitive=False)(request)
+            return await super().dispatch(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return self.handle_exception(request, exc)
+
+    def handle_exception(self, request, exc):
+        # As DRF's exception handler renders it
+        data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+        response = self.render(data, status=exc.status_code)
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            response['WWW-Authenticate'] = self.authentication.authenticate_header(request)
+        if getattr(exc, 'wait', None):
+            response['Retry-After'] = '%d' % exc.wait
+        return response
+
+    def select_renderer(self, request):
+        # DRF's content negotiation, over the Accept header only
+        accepts = [token.strip() for token in request.headers.get('Accept', '*/*').split(',') if token.strip()]
+        for media_types in order_by_precedence(accepts or ['*/*']):
+            for renderer in self.renderers:
+                if any(media_type_matches(renderer.media_type, media_type) for media_type in media_types):
+                    return renderer
+        raise exceptions.NotAcceptable(available_renderers=self.renderers)
+
+    def check_throttles(self, request):
+        waits = [throttle.wait() for throttle in (cls() for cls in self.throttle_classes) if not throttle.allow_request(request, self)]
+        if waits:
+            raise exceptions.Throttled(max((wait for wait in waits if wait is not None), default=None))
+
+    async def has_permission(self, request):
+        return True
+
+    def render(self, data, status=200):
+        return HttpResponse(self.renderer.render(data), status=status, content_type=self.renderer.media_type)
+
+    async def get_object_or_404(self, queryset, **lookup):
+        obj = await queryset.filter(**lookup).afirst()
+        if obj is None:
+            raise exceptions.NotFound(f'No {queryset.model._meta.object_name} matches the given query.')
+        return obj
+
+
+"""  Menu Items  """
+class AsyncMenuItemView(AsyncReadView):
+    throttle_scope = 'menu'
+    page_size = 5
+    page_size_query_param = 'perpage'
+    max_page_size = 100
+
+    async def get(self, request):
+        params = request.GET
+        filterset = MenuItemFilter(params, MenuItem.objects.all())
+        try:
+            if not filterset.is_valid():
+                raise ValidationError(filterset.errors)
+            queryset = filterset.qs
+            if MenuItemSearchFilter.get_search_text(params) is not None:
+                queryset = await sync_to_async(search_menu_items)(queryset, params['search'])
+                queryset = queryset.order_by(*RankOrderingFilter.search_ordering)
+            if params.get('ordering') in ('price', '-price'):
+                queryset = queryset.order_by(params['ordering'])
+            page_size = self.get_page_size(params)
+            page_number = int(params.get('page', 1))
+            count = await queryset.acount()
+        except (ValueError, TypeError, ValidationError):
+            raise exceptions.ParseError('Invalid filter value.')
+
+        pages = max(1, -(-count // page_size))
+        if not 1 <= page_number <= pages:
+            raise exceptions.NotFound('Invalid page.')
+
+        start = (page_number - 1) * page_size
+        items = [item async for item in queryset[start:start + page_size]]
+        url = request.build_absolute_uri()
+        return self.render({
+            'count': count,
+            'next': replace_query_param(url, 'page', page_number + 1) if page_number < pages else None,
+            'previous': self.previous_link(url, page_number),
+            'results': MenuItemSerializer(items, many=True).data,
+        })
+
+    def get_page_size(self, params):
+        try:
+            size = int(params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(size, self.max_page_size) if size > 0 else self.page_size
+
+    @staticmethod
+    def previous_link(url, page_number):
+        if page_number <= 1:
+            return None
+        if page_number == 2:
+            return remove_query_param(url, 'page')
+        return replace_query_param(url, 'page', page_number - 1)
+
+
+class AsyncSingleMenuItemView(AsyncReadView):
+    throttle_scope = 'menu'
+    async def get(self, request, pk):
+        item = await self.get_object_or_404(MenuItem.objects.all(), pk=pk)
+        return self.render(MenuItemSerializer(item).data)
+
+
+"""  Categories & Item of the Day  """
+class AsyncCategoryView(AsyncReadView):
+    throttle_scope = 'menu'
+    async def get(self, request):
+        categories = [category async for category in Category.objects.all()]
+        return self.render(CategorySerializer(categories, many=True).data)
+
+
+class AsyncItemOfDayView(AsyncReadView):
+    throttle_scope = 'menu'
+    async def get(self, request):
+        try:
+            item = await MenuItem.objects.aget(featured=True)
+        except MenuItem.DoesNotExist:
+            return self.render({"message": "No item of the day set"}, status=404)
+        except Exception as e:
+            return self.render({"error": f"An unexpected error occurred: {str(e)}"}, status=500)
+        return self.render(MenuItemSerializer(item).data)
+
+
+"""  Cart  """
+class AsyncCartView(AsyncReadView):
+    requires_authentication = True
+
+    async def has_permission(self, request):
+        return not await aget_roles(request.user)
+
+    async def get(self, request):
+        cart = [item async for item in Cart.objects.filter(user=request.user)]
+        return self.render(CartSerializer(cart, many=True).data)
+
+
+"""  Orders  """
+class AsyncOrderView(AsyncReadView):
+    requires_authentication = True
+
+    async def get(self, request):
+        roles = await aget_roles(request.user)
+        if MANAGER in roles:
+            queryset = Order.objects.all()
+        elif DELIVERY_CREW in roles:
+            queryset = Order.objects.filter(delivery_crew=request.user)
+        else:
+            queryset = Order.objects.filter(user=request.user)
+        orders = [order async for order in queryset.with_details()]
+        return self.render(OrderSerializer(orders, many=True).data)
+
+
+class AsyncOrderDetailView(AsyncReadView):
+    requires_authentication = True
+
+    async def get(self, request, order_id):
+        roles = await aget_roles(request.user)
+        queryset = Order.objects.with_details()
+        if not roles & {MANAGER, DELIVERY_CREW}:
+            queryset = queryset.filter(user=request.user)
+        order = await self.get_object_or_404(queryset, id=order_id)
+        return self.render(OrderSerializer(order).data)
+
+
+"""  Live order events (Server-Sent Events)  """
+class StreamingUnavailable(exceptions.APIException):
+    status_code = 501
+    default_detail = 'Live order events are only served by the ASGI application (Restaurants.asgi).'
+    default_code = 'not_implemented'
+
+
+class AsyncOrderStreamView(AsyncReadView):
+    """
+    Streams order events (created, assigned, delivered) as they happen, to the
+    same audience as api/orders/changes. Resumes after `Last-Event-ID` (or
+    ?since=); ?timeout=<seconds> closes the stream sooner, and 0 sends only
+    the backlog.
+
+    Only under ASGI: a WSGI server would buffer the whole stream, holding a
+    worker thread for as long as it stays open, before sending anything.
+    """
+    requires_authentication = True
+
+    def select_renderer(self, request):
+        # Errors are JSON; Accept asks for text/event-stream
+        return self.renderers[0]
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            raise StreamingUnavailable()
+        since = self.parse_int(request.headers.get('Last-Event-ID') or request.GET.get('since'), 'Invalid cursor.')
+        timeout = self.parse_int(request.GET.get('timeout'), 'Invalid timeout.')
+        roles = await aget_roles(request.user)
+        response = StreamingHttpResponse(
+            order_stream.stream_events(request.user, roles, since, timeout), content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'    # nginx: pass each event on as it comes
+        return response
+
+    @staticmethod
+    def parse_int(value, message):
+        if value is None:
+            return None
+        if not (value.isascii() and value.isdigit() and len(value) <= 18):
+            raise exceptions.ParseError(message)
+        return int(value)
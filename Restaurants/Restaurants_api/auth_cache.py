@@ -0,0 +1,23 @@
+"""
+The 'auth' cache: token-to-user and user lookups (authentication.py), group
+roles and JWT token versions (roles.py).
+
+Entries are dropped when what they hold changes, which reaches other workers
+only through a shared backend: with REDIS_URL set the cache lives in Redis,
+otherwise each worker keeps an entry for AUTH_CACHE_TIMEOUT seconds, a few
+by default (see settings.py).
+"""
+from django.core.cache import caches
+from django.db import connection, transaction
+
+
+def auth_cache():
+    return caches['auth']
+
+
+def invalidate(keys):
+    """Drops `keys` now and, inside a transaction, again once it commits."""
+    # Until the commit, another request can read the old rows and cache them again
+    auth_cache().delete_many(keys)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: auth_cache().delete_many(keys))
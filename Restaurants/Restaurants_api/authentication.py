@@ -0,0 +1,209 @@
+"""
+Authentication with one authenticator per request and cached lookups.
+
+The Authorization scheme (or, without one, the session cookie) picks the
+authenticator up front instead of trying Token, Session and JWT in turn.
+Token keys and user ids resolve through the 'auth' cache (auth_cache.py),
+so a repeat request with a token or JWT makes no authentication queries, and
+a JWT's role claims (see tokens.py) answer role checks for the request.
+signals.py drops entries when a token is deleted or a user is saved or
+deleted, for every worker when the cache is shared; writes that skip signals
+(QuerySet.update) last until the timeout.
+"""
+
+from hashlib import sha256
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import AnonymousUser, User
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, SessionAuthentication, TokenAuthentication, get_authorization_header
+from rest_framework.authtoken.models import Token
+from rest_framework_simplejwt.authentication import JWTAuthentication, AUTH_HEADER_TYPE_BYTES
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .auth_cache import auth_cache, invalidate
+from .roles import ROLES_CLAIM, VERSION_CLAIM, token_version, use_role_claims
+
+
+"""  Cached lookups  """
+def _token_key(key):
+    # Never use the secret itself as a cache key
+    return 'token:' + sha256(key.encode()).hexdigest()
+
+
+def _user_key(user_id):
+    return f'user:{user_id}'
+
+
+def get_user(user_id):
+    """The user with this id (a fresh instance per call), or None."""
+    key = _user_key(user_id)
+    user = auth_cache().get(key)
+    if user is None:
+        user = User.objects.filter(pk=user_id).first()
+        if user is not None:
+            auth_cache().set(key, user)
+    return user
+
+
+def get_token_user(key):
+    """The owner of auth token `key`, or None for an unknown key."""
+    user_id = auth_cache().get(_token_key(key))
+    if user_id is not None:
+        return get_user(user_id)
+    token = Token.objects.select_related('user').filter(key=key).first()
+    if token is None:
+        return None
+    auth_cache().set_many({_token_key(key): token.user_id, _user_key(token.user_id): token.user})
+    return token.user
+
+
+async def aget_user(user_id):
+    key = _user_key(user_id)
+    user = await auth_cache().aget(key)
+    if user is None:
+        user = await User.objects.filter(pk=user_id).afirst()
+        if user is not None:
+            await auth_cache().aset(key, user)
+    return user
+
+
+async def aget_token_user(key):
+    user_id = await auth_cache().aget(_token_key(key))
+    if user_id is not None:
+        return await aget_user(user_id)
+    token = await Token.objects.select_related('user').filter(key=key).afirst()
+    if token is None:
+        return None
+    await auth_cache().aset_many({_token_key(key): token.user_id, _user_key(token.user_id): token.user})
+    return token.user
+
+
+def invalidate_token(key):
+    invalidate([_token_key(key)])
+
+
+def invalidate_user(user_id):
+    invalidate([_user_key(user_id)])
+
+
+"""  Authenticators  """
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        user = self.check_user(get_token_user(key))
+        return user, Token(key=key, user=user)
+
+    async def aauthenticate(self, request):
+        return self.check_user(await aget_token_user(self.get_key(request)))
+
+    def get_key(self, request):
+        """The key of a 'Token <key>' header, refused as TokenAuthentication.authenticate refuses it."""
+        auth = get_authorization_header(request).split()
+        if len(auth) == 1:
+            raise exceptions.AuthenticationFailed(_('Invalid token header. No credentials provided.'))
+        if len(auth) > 2:
+            raise exceptions.AuthenticationFailed(_('Invalid token header. Token string should not contain spaces.'))
+        try:
+            return auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(_('Invalid token header. Token string should not contain invalid characters.'))
+
+    @staticmethod
+    def check_user(user):
+        if user is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        if jwt_settings.USER_ID_FIELD != 'id':
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        user = get_user(user_id)
+        if user is None:
+            raise exceptions.AuthenticationFailed(_('User not found'), code='user_not_found')
+        if jwt_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if jwt_settings.CHECK_REVOKE_TOKEN and (
+            validated_token.get(jwt_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password)
+        ):
+            raise exceptions.AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+        if ROLES_CLAIM in validated_token:
+            if validated_token.get(VERSION_CLAIM) != token_version(user.pk):
+                raise exceptions.AuthenticationFailed(_('Role claims are out of date, refresh the token.'), code='roles_outdated')
+            use_role_claims(user, validated_token)
+        return user
+
+    async def aauthenticate(self, request):
+        raw_token = self.get_raw_token(self.get_header(request))
+        if raw_token is None:
+            return None
+        return await sync_to_async(self.get_user)(self.get_validated_token(raw_token))
+
+
+class SchemeAuthentication(BaseAuthentication):
+    """
+    'Token <key>' goes to token auth, 'Bearer <jwt>' (SIMPLE_JWT's
+    AUTH_HEADER_TYPES) to JWT auth, and a request with no Authorization header
+    but a session cookie to session auth (with its CSRF check). Anything else
+    is anonymous, as it was when each authenticator declined in turn.
+    aauthenticate() makes the same choice for the async views.
+    """
+    token = CachedTokenAuthentication()
+    jwt = CachedJWTAuthentication()
+    session = SessionAuthentication()
+
+    def select(self, request):
+        """The authenticator for this request's credentials, or None for an anonymous request."""
+        header = get_authorization_header(request).split(None, 1)
+        if header:
+            scheme = header[0]
+            if scheme.lower() == self.token.keyword.lower().encode():
+                return self.token
+            if scheme in AUTH_HEADER_TYPE_BYTES:
+                return self.jwt
+            return None
+        if settings.SESSION_COOKIE_NAME in request.COOKIES:
+            return self.session
+        return None
+
+    def authenticate(self, request):
+        authenticator = self.select(request)
+        return authenticator.authenticate(request) if authenticator else None
+
+    async def aauthenticate(self, request):
+        """The request's user (AnonymousUser if none), for a Django request in an async view."""
+        authenticator = self.select(request)
+        if authenticator is self.session:
+            # The async views only read, so there is no CSRF check to make
+            user = await request.auser()
+        else:
+            user = authenticator and await authenticator.aauthenticate(request)
+        return user or AnonymousUser()
+
+    def authenticate_header(self, request):
+        return self.token.authenticate_header(request)
+
+
+class CachedModelBackend(ModelBackend):
+    """Session logins resolve the user through the same cache."""
+    def get_user(self, user_id):
+        user = get_user(user_id)
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        user = await aget_user(user_id)
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,135 @@
+"""
+A process-local Bloom filter over blacklisted JTIs.
+
+simplejwt checks every refresh token against the blacklist with a join over
+OutstandingToken and BlacklistedToken. The filter answers "certainly not
+blacklisted" from memory for almost every token, so only blacklisted tokens
+and the rare false positive (FALSE_POSITIVE_RATE) reach the database.
+
+Tokens blacklisted in this process are added at once (see signals.py). Rows
+written by other workers are pulled in incrementally, at most every
+BLACKLIST_FILTER_INTERVAL seconds, by reading the rows with a higher id than
+the last one seen; set the interval to 0 to check for them on every token.
+The filter is rebuilt from scratch when it fills up, and hourly so that
+pruned tokens stop costing false positives.
+"""
+
+import math
+import threading
+import time
+from hashlib import blake2b
+
+from django.conf import settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+
+FALSE_POSITIVE_RATE = 0.001
+REBUILD_INTERVAL = 3600
+# Rows are read again from this many ids back, in case a lower id committed late
+ID_OVERLAP = 100
+
+
+def sync_interval():
+    return getattr(settings, 'BLACKLIST_FILTER_INTERVAL', 1.0)
+
+
+class BloomFilter:
+    """`capacity` items at FALSE_POSITIVE_RATE, in about 1.8 bytes per item."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.size = max(64, math.ceil(-capacity * math.log(FALSE_POSITIVE_RATE) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = blake2b(item.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class BlacklistFilter:
+    def __init__(self, capacity=None):
+        self.initial_capacity = capacity or getattr(settings, 'BLACKLIST_FILTER_CAPACITY', 100_000)
+        self._lock = threading.Lock()
+        self.bloom = None
+        self.last_id = 0
+        self.recent_ids = set()
+        self.next_sync = self.next_rebuild = 0.0
+
+    def rebuild(self):
+        rows = BlacklistedToken.objects.values_list('id', 'token__jti')
+        count = rows.count()
+        bloom = BloomFilter(max(self.initial_capacity, count * 2))
+        ids = []
+        for row_id, jti in rows.iterator(chunk_size=10_000):
+            bloom.add(jti)
+            ids.append(row_id)
+        self.bloom, self.last_id, self.recent_ids = bloom, 0, set()
+        self._seen(ids)
+        self.next_rebuild = time.monotonic() + REBUILD_INTERVAL
+
+    def sync(self):
+        """Adds rows blacklisted since the last sync, or rebuilds when due."""
+        now = time.monotonic()
+        if now < self.next_sync:
+            return
+        with self._lock:
+            if now < self.next_sync:
+                return
+            if self.bloom is None or now >= self.next_rebuild:
+                self.rebuild()
+            else:
+                rows = BlacklistedToken.objects.filter(id__gt=self.last_id - ID_OVERLAP).values_list('id', 'token__jti')
+                ids = []
+                for row_id, jti in rows:
+                    if row_id not in self.recent_ids:
+                        self.bloom.add(jti)
+                        ids.append(row_id)
+                self._seen(ids)
+                if self.bloom.count > self.bloom.capacity:
+                    self.rebuild()
+            self.next_sync = time.monotonic() + sync_interval()
+
+    def _seen(self, ids):
+        # Remember the ids near the top, which the next sync reads again
+        if ids:
+            self.last_id = max(self.last_id, max(ids))
+        self.recent_ids = {row_id for row_id in (*self.recent_ids, *ids) if row_id > self.last_id - ID_OVERLAP}
+
+    def add(self, jti):
+        if self.bloom is not None:
+            self.bloom.add(jti)
+
+    def might_contain(self, jti):
+        self.sync()
+        return jti in self.bloom
+
+
+_filter = BlacklistFilter()
+
+
+def is_blacklisted(jti):
+    """The blacklist check simplejwt makes, through the filter."""
+    if not _filter.might_contain(jti):
+        return False
+    return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+
+def token_blacklisted(jti):
+    _filter.add(jti)
+
+
+def reset_filter():
+    global _filter
+    _filter = BlacklistFilter()
@@ -0,0 +1,46 @@
+from collections import Counter
+
+from django.db import connection, transaction
+from rest_framework import serializers
+
+from .models import MenuItem, Cart
+
+
+MAX_CART_BATCH = 100
+
+
+"""  Cart upsert  """
+def add_to_cart(user, lines):
+    """
+    Adds (menuitem id, quantity) lines to the user's cart. Lines for items
+    already in the cart increment their quantity. All prices are read in one
+    query and every line is written by a single INSERT ... ON CONFLICT.
+    Returns the ids of the menu items touched.
+    """
+    quantities = Counter()
+    for menuitem_id, quantity in lines:
+        quantities[menuitem_id] += quantity
+    if not quantities:
+        return []
+
+    prices = dict(MenuItem.objects.filter(id__in=quantities).values_list('id', 'price'))
+    missing = [pk for pk in quantities if pk not in prices]
+    if missing:
+        raise serializers.ValidationError({'menuitem': [f'Invalid pk "{pk}" - object does not exist.' for pk in missing]})
+
+    table = connection.ops.quote_name(Cart._meta.db_table)
+    rows = ', '.join(['(%s, %s, %s, %s, %s)'] * len(quantities))
+    params = []
+    for menuitem_id, quantity in quantities.items():
+        params += [user.pk, menuitem_id, quantity, prices[menuitem_id], prices[menuitem_id] * quantity]
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} (user_id, menuitem_id, quantity, unit_price, price) VALUES {rows} '
+            f'ON CONFLICT (menuitem_id, user_id) DO UPDATE SET '
+            f'quantity = {table}.quantity + EXCLUDED.quantity, '
+            f'unit_price = EXCLUDED.unit_price, '
+            f'price = EXCLUDED.unit_price * ({table}.quantity + EXCLUDED.quantity)',
+            params,
+        )
+    return list(quantities)
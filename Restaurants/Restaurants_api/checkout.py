@@ -0,0 +1,40 @@
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Sum
+
+from . import order_events
+from .models import Cart, Order, OrderEvent, OrderItem
+
+
+"""  Checkout  """
+def place_order(user):
+    """
+    Turns the user's cart into an Order in one transaction and returns it, or
+    None when the cart is empty. The cart rows are locked first, so parallel
+    checkouts for the same user serialise and the later ones find an empty
+    cart. Items added to the cart meanwhile are left for the next order.
+    Six statements whatever the cart size: lock, total, order, items, clear,
+    and the order's 'created' event (plus the event lock on PostgreSQL).
+    """
+    with transaction.atomic():
+        cart = list(
+            Cart.objects.select_for_update()
+            .filter(user=user)
+            .values_list('id', 'menuitem_id', 'quantity', 'unit_price', 'price')
+        )
+        if not cart:
+            return None
+
+        cart_ids = [row[0] for row in cart]
+        locked = Cart.objects.filter(id__in=cart_ids)
+        total = locked.aggregate(total=Sum('price'))['total']
+
+        order = Order.objects.create(user=user, total=total, date=date.today())
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, menuitem_id=menuitem_id, quantity=quantity, unit_price=unit_price, total_price=price)
+            for _, menuitem_id, quantity, unit_price, price in cart
+        )
+        locked.delete()
+        order_events.record(OrderEvent.CREATED, [(order.id, user.pk, None)])
+    return order
@@ -0,0 +1,95 @@
+from datetime import datetime, timezone
+from functools import wraps
+from hashlib import sha1
+
+from django.core.cache import caches
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+
+from .models import MenuItem, Category, Order
+from .response_cache import CACHE_ALIAS, get_version
+from .roles import MANAGER, DELIVERY_CREW, has_role
+
+
+CATALOGUE_CACHE_CONTROL = {'public': True, 'max_age': 30}
+ORDER_CACHE_CONTROL = {'private': True, 'no_cache': True}
+
+
+"""  Change markers  """
+def catalogue_validators():
+    """
+    (marker, last_modified) for the whole menu. Computed with one aggregate per
+    table and memoised under the catalogue version, so it is re-read only after
+    a MenuItem/Category write.
+    """
+    cache = caches[CACHE_ALIAS]
+    version = get_version()
+    key = f'catalogue:{version}:validators'
+    validators = cache.get(key)
+    if validators is None:
+        items = MenuItem.objects.aggregate(count=Count('id'), last=Max('updated_at'))
+        categories = Category.objects.aggregate(count=Count('id'), last=Max('updated_at'))
+        marker = f"{items['count']}.{items['last']}.{categories['count']}.{categories['last']}"
+        # A delete leaves no updated_at behind, but it moves the version, which is the time of the last write
+        written = datetime.fromtimestamp(version / 1e9, tz=timezone.utc)
+        last_modified = max(filter(None, [items['last'], categories['last'], written]))
+        validators = (marker, last_modified)
+        cache.set(key, validators)
+    return validators
+
+
+def catalogue_view_validators(view, request, *args, **kwargs):
+    return catalogue_validators()
+
+
+def order_validators(view, request, order_id):
+    orders = Order.objects.filter(id=order_id)
+    if not (has_role(request.user, MANAGER) or has_role(request.user, DELIVERY_CREW)):
+        orders = orders.filter(user=request.user)
+    updated_at = orders.values_list('updated_at', flat=True).first()
+    if updated_at is None:
+        return None, None
+    # Order items render menu item titles and prices, so menu edits count too
+    catalogue_marker, catalogue_modified = catalogue_validators()
+    return f'{order_id}.{updated_at.isoformat()}.{catalogue_marker}', max(updated_at, catalogue_modified)
+
+
+"""  Conditional GET  """
+def conditional_get(get_validators, cache_control):
+    """
+    Answers If-None-Match / If-Modified-Since with 304 before the handler
+    runs, and stamps ETag, Last-Modified and Cache-Control on full responses.
+    get_validators(view, request, *args, **kwargs) returns (marker, last_modified);
+    a None marker skips validation and lets the handler respond (e.g. 404).
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            marker, last_modified = get_validators(self, request, *args, **kwargs)
+            if marker is None:
+                return method(self, request, *args, **kwargs)
+
+            # Each negotiated format is a separate representation
+            representation = f'{marker}:{request.accepted_media_type}'
+            etag = quote_etag(sha1(representation.encode()).hexdigest())
+            timestamp = int(last_modified.timestamp()) if last_modified else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if response is None:
+                response = method(self, request, *args, **kwargs)
+            if response.status_code not in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+                return response
+
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+            if getattr(request.accepted_renderer, 'format', None) == 'api':
+                patch_cache_control(response, private=True, no_cache=True)
+            else:
+                patch_cache_control(response, **cache_control)
+            patch_vary_headers(response, ['Accept'])
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,143 @@
+"""
+Handing out orders to the delivery crew.
+
+Crew members claim the oldest open, unassigned order themselves. The
+candidate row is locked with SELECT ... FOR UPDATE SKIP LOCKED, so parallel
+claimers each lock a different row instead of queueing behind one another,
+and the partial index on open unassigned orders (order_unassigned_idx) keeps
+finding the next one cheap however long the order history grows. The UPDATE
+still requires the order to be unassigned, which is what keeps claims
+exclusive on databases without row locks (SQLite).
+
+Managers assign orders in bulk, naming the crew member for each order or
+letting the batch be spread over the crew by their open-order counts. A batch
+costs the same few statements whatever its size: crew lookup, order lock,
+(when balancing) open-order counts, one UPDATE and the INSERT of its events
+(after the event lock, on PostgreSQL).
+"""
+
+import heapq
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Case, Count, IntegerField, Value, When
+from django.utils import timezone
+from rest_framework import serializers
+
+from . import order_events
+from .models import Order, OrderEvent
+from .roles import DELIVERY_CREW
+
+
+MAX_ASSIGN_BATCH = 500
+
+
+def unassigned_orders():
+    # Matches the condition of order_unassigned_idx
+    return Order.objects.filter(delivery_crew__isnull=True, status=False)
+
+
+"""  Claiming  """
+def claim_order(crew):
+    """Assigns the oldest open, unassigned order to `crew`; returns its id, or None when there is none."""
+    while True:
+        with transaction.atomic():
+            queryset = unassigned_orders().order_by('id')
+            if connection.features.has_select_for_update_skip_locked:
+                queryset = queryset.select_for_update(skip_locked=True)
+            row = queryset.values_list('id', 'user_id').first()
+            if row is None:
+                return None
+            order_id, customer_id = row
+            if unassigned_orders().filter(id=order_id).update(delivery_crew=crew, updated_at=timezone.now()):
+                order_events.record(OrderEvent.ASSIGNED, [(order_id, customer_id, crew.pk)])
+                return order_id
+        # Only without row locks: another claimer took it between the two statements
+
+
+"""  Bulk assignment  """
+def crew_members(usernames=None):
+    """{username: user id} of active delivery crew, limited to `usernames` when given."""
+    crew = User.objects.filter(groups__name=DELIVERY_CREW, is_active=True)
+    if usernames is not None:
+        crew = crew.filter(username__in=usernames)
+    return dict(crew.values_list('username', 'id'))
+
+
+def _lock_orders(order_ids):
+    """Locks the orders, which must all be open, and returns {order id: customer id}."""
+    # In id order, so overlapping batches lock in the same order and never deadlock.
+    # Checked under the lock, so an order delivered meanwhile is not handed out again.
+    rows = Order.objects.select_for_update().filter(id__in=order_ids).order_by('id').values_list('id', 'user_id', 'status')
+    customers, delivered = {}, []
+    for order_id, customer_id, is_delivered in rows:
+        customers[order_id] = customer_id
+        if is_delivered:
+            delivered.append(order_id)
+    missing = [pk for pk in order_ids if pk not in customers]
+    if missing:
+        raise serializers.ValidationError({'orders': [f'Invalid pk "{pk}" - object does not exist.' for pk in missing]})
+    if delivered:
+        raise serializers.ValidationError({'orders': [f'Order {pk} has already been delivered.' for pk in delivered]})
+    return customers
+
+
+def _apply(plan, customers):
+    """One UPDATE setting each order in `plan` ({order id: crew id}) to its crew member, and one INSERT of their events."""
+    by_crew = {}
+    for order_id, crew_id in plan.items():
+        by_crew.setdefault(crew_id, []).append(order_id)
+    Order.objects.filter(id__in=plan).update(
+        delivery_crew=Case(*(When(id__in=ids, then=Value(crew_id)) for crew_id, ids in by_crew.items()), output_field=IntegerField()),
+        updated_at=timezone.now(),
+    )
+    order_events.record(OrderEvent.ASSIGNED, [(order_id, customers[order_id], crew_id) for order_id, crew_id in plan.items()])
+
+
+def _unknown_crew(usernames, crew):
+    unknown = sorted(set(usernames) - set(crew))
+    if unknown:
+        raise serializers.ValidationError({'username': [f'"{name}" is not a delivery crew member.' for name in unknown]})
+
+
+def assign_orders(assignments):
+    """Assigns each order id in `assignments` ({order id: username}); returns {order id: username}."""
+    crew = crew_members(set(assignments.values()))
+    _unknown_crew(assignments.values(), crew)
+    with transaction.atomic():
+        customers = _lock_orders(list(assignments))
+        _apply({order_id: crew[username] for order_id, username in assignments.items()}, customers)
+    return dict(assignments)
+
+
+def balance_orders(order_ids, usernames=None):
+    """
+    Spreads `order_ids` over the delivery crew (or `usernames`): each order, in
+    id order, goes to whoever then has the fewest open orders, counting the
+    ones handed out so far. Returns {order id: username}.
+    """
+    crew = crew_members(usernames)
+    if usernames is not None:
+        _unknown_crew(usernames, crew)
+    if not crew:
+        raise serializers.ValidationError({'usernames': ['There is no delivery crew to assign to.']})
+
+    with transaction.atomic():
+        customers = _lock_orders(order_ids)
+        # Orders in this batch are being reassigned, so they don't count towards anyone's load
+        load = dict(
+            Order.objects.filter(status=False, delivery_crew__in=crew.values())
+            .exclude(id__in=order_ids)
+            .values('delivery_crew').annotate(open=Count('id'))
+            .values_list('delivery_crew', 'open')
+        )
+        names = {crew_id: username for username, crew_id in crew.items()}
+        heap = [(load.get(crew_id, 0), crew_id) for crew_id in names]
+        heapq.heapify(heap)
+        plan = {}
+        for order_id in sorted(order_ids):
+            count, crew_id = heap[0]
+            plan[order_id] = crew_id
+            heapq.heapreplace(heap, (count + 1, crew_id))
+        _apply(plan, customers)
+    return {order_id: names[crew_id] for order_id, crew_id in plan.items()}
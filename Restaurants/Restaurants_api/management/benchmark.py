@@ -0,0 +1,324 @@
+"""
+Endpoint benchmark suite.
+
+seed_dataset() builds a deterministic catalogue/user/order history and
+SCENARIOS drive every route in Restaurants_api/urls.py through the test
+client against it. Each scenario runs inside a transaction that is rolled
+back, so writes leave the dataset as they found it and every iteration sees
+the same data. run_suite() records latency percentiles, query count and
+allocated memory per scenario and checks them against the scenario's query
+budget and p95 latency threshold.
+"""
+
+import random
+import time
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User, Group
+from django.db import connection, transaction
+from django.test import AsyncRequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from Restaurants_api.models import MenuItem, Category, Cart, Order, OrderItem, OrderEvent
+from Restaurants_api.response_cache import bump_version
+from Restaurants_api.roles import MANAGER, DELIVERY_CREW
+
+
+BENCH_PASSWORD = 'bench-password'
+TRANSACTION_CONTROL = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT', 'BEGIN', 'COMMIT', 'ROLLBACK')
+
+
+"""  Dataset  """
+class Dataset:
+    """Handles on the seeded rows the scenarios refer to."""
+
+    def __init__(self, **attrs):
+        self.__dict__.update(attrs)
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+
+def seed_dataset(scale=1.0, seed=0):
+    """
+    At scale 1: 1,000 categories, 5,000 menu items, 20,000 users (5 managers,
+    50 delivery crew) and 30,000 orders of one to four items over the last
+    year, with their change events. Users get an unusable password, except
+    the four principals the scenarios act as, which also get an auth token.
+    """
+    rng = random.Random(seed)
+
+    def scaled(count, minimum=1):
+        return max(minimum, int(count * scale))
+
+    categories = Category.objects.bulk_create(
+        Category(slug=f'category-{i}', title=f'Category {i}') for i in range(scaled(1000))
+    )
+    items = MenuItem.objects.bulk_create(
+        MenuItem(
+            title=f'Dish {i}', price=Decimal(rng.randint(200, 5000)) / 100,
+            featured=i == 0, category=rng.choice(categories),
+        )
+        for i in range(scaled(5000, minimum=10))
+    )
+
+    unusable = make_password(None)
+    users = User.objects.bulk_create(
+        User(username=f'user{i}', password=unusable) for i in range(scaled(20000, minimum=10))
+    )
+    managers, crew, customers = users[:5], users[5:5 + scaled(50)], users[5 + scaled(50):]
+    Group.objects.get_or_create(name=MANAGER)[0].user_set.add(*managers)
+    Group.objects.get_or_create(name=DELIVERY_CREW)[0].user_set.add(*crew)
+
+    today = date.today()
+    orders = Order.objects.bulk_create(
+        Order(
+            user=rng.choice(customers), delivery_crew=rng.choice(crew + [None]),
+            status=rng.random() < 0.6, total=Decimal('0.00'),
+            date=today - timedelta(days=rng.randrange(365)),
+        )
+        for _ in range(scaled(30000))
+    )
+    lines = []
+    for order in orders:
+        for item in rng.sample(items, rng.randint(1, 4)):
+            quantity = rng.randint(1, 3)
+            lines.append(OrderItem(order=order, menuitem=item, quantity=quantity, unit_price=item.price, total_price=item.price * quantity))
+            order.total += item.price * quantity
+    OrderItem.objects.bulk_create(lines, batch_size=5000)
+    Order.objects.bulk_update(orders, ['total'], batch_size=5000)
+    events = OrderEvent.objects.bulk_create(
+        (
+            OrderEvent(order=order, kind=kind, customer_id=order.user_id, delivery_crew_id=order.delivery_crew_id)
+            for order in orders
+            for kind, happened in ((OrderEvent.CREATED, True), (OrderEvent.ASSIGNED, order.delivery_crew_id), (OrderEvent.DELIVERED, order.status))
+            if happened
+        ),
+        batch_size=5000,
+    )
+
+    customer = customers[0]
+    admin = User.objects.create_superuser(username='bench-admin', password=BENCH_PASSWORD)
+    order = Order.objects.create(user=customer, delivery_crew=crew[0], total=items[1].price, date=today)
+    OrderItem.objects.create(order=order, menuitem=items[1], quantity=1, unit_price=items[1].price, total_price=items[1].price)
+    cart = Cart.objects.bulk_create(
+        Cart(user=customer, menuitem=item, quantity=2, unit_price=item.price, price=item.price * 2) for item in items[2:7]
+    )
+
+    principals = {'admin': admin, 'manager': managers[0], 'crew': crew[0], 'customer': customer}
+    return Dataset(
+        tokens={role: Token.objects.create(user=user).key for role, user in principals.items()},
+        **{f'{role}_id': user.pk for role, user in principals.items()},
+        **{f'{role}_name': user.username for role, user in principals.items()},
+        spare_customer=customers[1].username,
+        category_id=categories[0].pk,
+        item_id=items[0].pk,
+        other_item_id=items[8].pk,
+        order_id=order.pk,
+        cart_line_id=cart[0].pk,
+        since=(today - timedelta(days=30)).isoformat(),
+        since_event=events[len(events) // 2].pk,   # a poller halfway through the change log
+        open_order_ids=[order.pk for order in orders if not order.status][:200],   # a lunch rush to dispatch
+    )
+
+
+"""  Scenarios  """
+class Scenario:
+    """
+    One request against the dataset. `path` and string values in `data` are
+    formatted with the dataset; `data` may also be a callable taking it.
+    `queries` is the query budget and `p95_ms` the latency threshold. `asgi`
+    scenarios call their view with an ASGI request instead of going through
+    the WSGI handler. `cold` scenarios retire the cached catalogue before every
+    request, so they measure the reads behind a cache miss.
+    """
+
+    def __init__(self, name, method, path, role=None, data=None, content_type=None, expect=200, queries=None, p95_ms=None, asgi=False, cold=False):
+        self.name, self.method, self.path, self.role = name, method, path, role
+        self.data, self.content_type, self.expect = data, content_type, expect
+        self.queries, self.p95_ms, self.asgi, self.cold = queries, p95_ms, asgi, cold
+
+    def url(self, dataset):
+        return '/api/' + self.path.format_map(dataset)
+
+    def build(self, dataset):
+        path = self.url(dataset)
+        data = self.data(dataset) if callable(self.data) else self.data
+        if isinstance(data, str):
+            data = data.format_map(dataset)
+        elif isinstance(data, dict):
+            data = {key: value.format_map(dataset) if isinstance(value, str) else value for key, value in data.items()}
+        return path, data
+
+
+def _refresh(dataset):
+    return {'refresh': str(RefreshToken.for_user(User.objects.get(pk=dataset.customer_id)))}
+
+
+SCENARIOS = [
+    # Menu items
+    Scenario('menu items', 'get', 'menu-items/', queries=0, p95_ms=20),
+    Scenario('menu items (cursor)', 'get', 'menu-items/?pagination=cursor&ordering=-price', queries=0, p95_ms=20),
+    Scenario('menu items (filtered)', 'get', 'menu-items/?category={category_id}&perpage=20', queries=0, p95_ms=20),
+    Scenario('menu items (cold)', 'get', 'menu-items/', queries=4, p95_ms=30, cold=True),
+    Scenario('menu items (cursor, cold)', 'get', 'menu-items/?pagination=cursor&ordering=-price', queries=3, p95_ms=30, cold=True),
+    Scenario('menu items (filtered, cold)', 'get', 'menu-items/?category={category_id}&perpage=20', queries=4, p95_ms=30, cold=True),
+    Scenario('create menu item', 'post', 'menu-items/', 'manager', {'title': 'Bench dish', 'price': '9.50', 'featured': False, 'category': '{category_id}'}, expect=201, queries=3, p95_ms=30),
+    Scenario('menu item', 'get', 'menu-item/{item_id}', queries=0, p95_ms=20),
+    Scenario('menu item (cold)', 'get', 'menu-item/{item_id}', queries=1, p95_ms=20, cold=True),
+    Scenario('update menu item', 'patch', 'menu-item/{item_id}', 'manager', {'price': '12.00'}, queries=3, p95_ms=30),
+    Scenario('delete menu item', 'delete', 'menu-item/{other_item_id}', 'manager', expect=204, queries=5, p95_ms=30),
+    Scenario('import menu items', 'post', 'menu-items/import', 'manager', 'title,price,category\nImported,4.50,category-0\n', content_type='text/csv', queries=3, p95_ms=30),
+    Scenario('export menu items', 'get', 'menu-items/export.csv', 'manager', queries=2, p95_ms=150),
+
+    # Groups
+    Scenario('list managers', 'get', 'groups/manager/users', 'admin', queries=3, p95_ms=30),
+    Scenario('add manager', 'post', 'groups/manager/users', 'admin', {'username': '{spare_customer}'}, expect=201, queries=6, p95_ms=30),
+    Scenario('remove manager', 'delete', 'groups/manager/users/{manager_id}', 'admin', queries=6, p95_ms=30),
+    Scenario('list delivery crew', 'get', 'groups/delivery-crew/users', 'manager', queries=3, p95_ms=30),
+    Scenario('add delivery crew', 'post', 'groups/delivery-crew/users', 'manager', {'username': '{spare_customer}'}, expect=201, queries=6, p95_ms=30),
+    Scenario('remove delivery crew', 'delete', 'groups/delivery-crew/users/{crew_id}', 'manager', queries=6, p95_ms=30),
+
+    # Cart
+    Scenario('cart', 'get', 'cart/menu-items', 'customer', queries=2, p95_ms=20),
+    Scenario('add to cart', 'post', 'cart/menu-items', 'customer', lambda d: [{'menuitem': d.item_id, 'quantity': 1}, {'menuitem': d.other_item_id, 'quantity': 2}], expect=201, queries=4, p95_ms=30),
+    Scenario('empty cart', 'delete', 'cart/menu-items', 'customer', expect=204, queries=2, p95_ms=20),
+    Scenario('remove cart line', 'delete', 'cart/menu-items/{cart_line_id}', 'customer', expect=204, queries=3, p95_ms=30),
+
+    # Orders
+    Scenario('customer orders', 'get', 'orders/', 'customer', queries=3, p95_ms=20),
+    Scenario('crew orders', 'get', 'orders/', 'crew', queries=3, p95_ms=120),
+    Scenario('manager orders (cursor)', 'get', 'orders/?pagination=cursor', 'manager', queries=3, p95_ms=20),
+    Scenario('place order', 'post', 'orders/', 'customer', expect=201, queries=7, p95_ms=30),
+    Scenario('order', 'get', 'orders/{order_id}', 'customer', queries=4, p95_ms=30),
+    Scenario('mark delivered', 'patch', 'orders/{order_id}', 'crew', queries=5, p95_ms=30),
+    Scenario('assign order', 'post', 'orders/{order_id}', 'manager', {'username': '{crew_name}'}, queries=5, p95_ms=30),
+    Scenario('order changes', 'get', 'orders/changes?since={since_event}', 'crew', queries=3, p95_ms=30),
+    Scenario('assign orders', 'post', 'orders/assign', 'manager', lambda d: {'orders': d.open_order_ids}, queries=7, p95_ms=60),
+    Scenario('claim order', 'post', 'orders/claim', 'crew', queries=6, p95_ms=30),
+    # Exports add one query per 2,000 orders streamed
+    Scenario('export orders', 'get', 'orders/export.ndjson?date_from={since}', 'manager', queries=4, p95_ms=600),
+
+    # Categories & item of the day
+    Scenario('categories', 'get', 'category/', queries=0, p95_ms=20),
+    Scenario('categories (cold)', 'get', 'category/', queries=1, p95_ms=30, cold=True),
+    Scenario('create category', 'post', 'category/', 'admin', {'slug': 'bench', 'title': 'Bench'}, expect=201, queries=2, p95_ms=30),
+    Scenario('item of the day', 'get', 'itemofday/', queries=0, p95_ms=20),
+    Scenario('item of the day (cold)', 'get', 'itemofday/', queries=3, p95_ms=20, cold=True),
+    Scenario('set item of the day', 'post', 'itemofday/', 'manager', {'item_id': '{other_item_id}'}, queries=4, p95_ms=30),
+
+    # Authentication (password hashing dominates by design)
+    Scenario('token auth', 'post', 'api-token-auth/', data={'username': 'bench-admin', 'password': BENCH_PASSWORD}, queries=2, p95_ms=2000),
+    Scenario('jwt obtain', 'post', 'token/', data={'username': 'bench-admin', 'password': BENCH_PASSWORD}, queries=2, p95_ms=2000),
+    Scenario('jwt refresh', 'post', 'token/refresh/', data=_refresh, queries=4, p95_ms=30),
+    Scenario('jwt blacklist', 'post', 'token/blacklist/', data=_refresh, queries=7, p95_ms=30),
+
+    # Async read endpoints
+    Scenario('async menu items', 'get', 'async/menu-items/', queries=2, p95_ms=30),
+    Scenario('async menu item', 'get', 'async/menu-item/{item_id}', queries=1, p95_ms=30),
+    Scenario('async categories', 'get', 'async/category/', queries=1, p95_ms=100),
+    Scenario('async item of the day', 'get', 'async/itemofday/', queries=1, p95_ms=30),
+    Scenario('async cart', 'get', 'async/cart/menu-items', 'customer', queries=2, p95_ms=30),
+    Scenario('async orders', 'get', 'async/orders/', 'customer', queries=3, p95_ms=40),
+    Scenario('async order', 'get', 'async/orders/{order_id}', 'customer', queries=3, p95_ms=40),
+    # The stream is only served over ASGI
+    Scenario('async order stream (backlog)', 'get', 'async/orders/stream?since={since_event}&timeout=0', 'crew', queries=3, p95_ms=40, asgi=True),
+]
+
+
+"""  Runner  """
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def read_stream(response):
+    if not response.is_async:
+        return b''.join(response.streaming_content)
+
+    async def read():
+        return b''.join([chunk async for chunk in response.streaming_content])
+    return async_to_sync(read)()
+
+
+def run_scenario(scenario, dataset, iterations):
+    """
+    Returns a result dict: status, latency percentiles (ms) over
+    `iterations` timed requests after one warm-up, and the query count and
+    peak allocated memory of one further request run under tracemalloc.
+    """
+    headers = {'Authorization': f'Token {dataset.tokens[scenario.role]}'} if scenario.role else {}
+    client = AsyncRequestFactory() if scenario.asgi else APIClient(headers=headers)
+
+    def send(path, data):
+        kwargs = {'content_type': scenario.content_type} if scenario.content_type else {}
+        if scenario.asgi:
+            # Straight to the view: the ASGI handler's ThreadSensitiveContext would run
+            # its ORM calls on a thread of their own, outside the scenario's transaction
+            match = resolve(path.partition('?')[0])
+            request = getattr(client, scenario.method)(path, data, headers=headers, **kwargs)
+            return async_to_sync(match.func)(request, *match.args, **match.kwargs)
+        return getattr(client, scenario.method)(path, data, **(kwargs or {'format': 'json'}))
+
+    def request():
+        if scenario.cold:
+            bump_version()
+        with transaction.atomic():
+            path, data = scenario.build(dataset)
+            started = time.perf_counter()
+            response = send(path, data)
+            if response.streaming:
+                read_stream(response)
+            elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+        return response.status_code, elapsed
+
+    status, _ = request()
+    latencies = sorted(request()[1] * 1000 for _ in range(iterations))
+
+    with CaptureQueriesContext(connection) as queries:
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            request()
+            allocated = tracemalloc.get_traced_memory()[1] - before
+        finally:
+            tracemalloc.stop()
+
+    return {
+        'name': scenario.name,
+        'method': scenario.method.upper(),
+        'path': scenario.path,
+        'status': status,
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+        'queries': sum(1 for query in queries.captured_queries if not query['sql'].startswith(TRANSACTION_CONTROL)),
+        'allocated_kb': allocated / 1024,
+    }
+
+
+def check(scenario, result, latency_factor=1.0):
+    """Budget violations of one result, as messages."""
+    failures = []
+    if result['status'] != scenario.expect:
+        failures.append(f'status {result["status"]}, expected {scenario.expect}')
+    if scenario.queries is not None and result['queries'] > scenario.queries:
+        failures.append(f'{result["queries"]} queries, budget {scenario.queries}')
+    if scenario.p95_ms is not None and latency_factor and result['p95_ms'] > scenario.p95_ms * latency_factor:
+        failures.append(f'p95 {result["p95_ms"]:.1f} ms, threshold {scenario.p95_ms * latency_factor:.0f} ms')
+    return failures
+
+
+def run_suite(dataset, scenarios=SCENARIOS, iterations=20, latency_factor=1.0):
+    """Yields (scenario, result, failures) for each scenario in turn."""
+    for scenario in scenarios:
+        result = run_scenario(scenario, dataset, iterations)
+        yield scenario, result, check(scenario, result, latency_factor)
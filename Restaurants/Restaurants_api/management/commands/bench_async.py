@@ -0,0 +1,114 @@
+import asyncio
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.core.asgi import get_asgi_application
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.views import APIView
+
+from Restaurants_api.async_views import AsyncReadView
+
+
+PUBLIC_PATHS = ['menu-items/', 'category/', 'itemofday/']
+USER_PATHS = ['cart/menu-items', 'orders/']
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare throughput of the sync DRF read endpoints (/api/...) with their "
+        "async counterparts (/api/async/...) through the ASGI handler at the same "
+        "concurrency. Runs against the configured database; throttling and the "
+        "catalogue response cache are disabled for the run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Requests per endpoint and mode')
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--user', help='Username to authenticate as (token auth) for cart/order paths')
+        parser.add_argument('paths', nargs='*', help='Paths relative to /api/ (default: the public reads, plus cart and orders with --user)')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or PUBLIC_PATHS + (USER_PATHS if options['user'] else [])
+        headers = [(b'host', b'localhost'), (b'accept', b'application/json')]
+        if options['user']:
+            user = User.objects.get(username=options['user'])
+            token, _ = Token.objects.get_or_create(user=user)
+            headers.append((b'authorization', f'Token {token.key}'.encode()))
+
+        caches = dict(settings.CACHES, catalogue={'BACKEND': 'django.core.cache.backends.dummy.DummyCache'})
+        throttles = APIView.throttle_classes, AsyncReadView.throttle_classes
+        APIView.throttle_classes = AsyncReadView.throttle_classes = []
+        try:
+            with override_settings(CACHES=caches):
+                rows = asyncio.run(self.run_all(paths, options['requests'], options['concurrency'], headers))
+        finally:
+            APIView.throttle_classes, AsyncReadView.throttle_classes = throttles
+
+        self.stdout.write(f"{'path':<28}{'mode':<7}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}")
+        for path, mode, rate, p50, p95, errors in rows:
+            self.stdout.write(f'{path:<28}{mode:<7}{rate:>10.1f}{p50:>10.2f}{p95:>10.2f}{errors:>8}')
+
+    async def run_all(self, paths, requests, concurrency, headers):
+        rows = []
+        for path in paths:
+            for mode, prefix in (('sync', '/api/'), ('async', '/api/async/')):
+                rows.append((path, mode) + await self.run(prefix + path, requests, concurrency, headers))
+        return rows
+
+    async def run(self, url, requests, concurrency, headers):
+        application = get_asgi_application()
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies, errors = [], 0
+
+        async def one():
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                status = await self.call(application, url, headers)
+                latencies.append(time.perf_counter() - started)
+                if status >= 400 and status != 404:
+                    errors += 1
+
+        await self.call(application, url, headers)    # warm up
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        return requests / elapsed, statistics.median(latencies) * 1000, p95 * 1000, errors
+
+    @staticmethod
+    async def call(application, url, headers):
+        """One GET through the ASGI app, behaving like a server whose client stays connected."""
+        path, _, query = url.partition('?')
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+            'query_string': query.encode(), 'headers': headers,
+            'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+        }
+        finished = asyncio.Event()
+        body_sent = False
+        status = None
+
+        async def receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await finished.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+
+        await application(scope, receive, send)
+        finished.set()
+        return status
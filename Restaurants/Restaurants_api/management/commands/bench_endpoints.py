@@ -0,0 +1,66 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.views import APIView
+
+from Restaurants_api.async_views import AsyncReadView
+from Restaurants_api.management.benchmark import SCENARIOS, seed_dataset, run_suite
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a large deterministic dataset into a fresh test database and drive "
+        "every API route through the test client, reporting latency percentiles, "
+        "query count and allocated memory per endpoint. Fails when an endpoint "
+        "exceeds its query budget or p95 latency threshold. Throttling is disabled "
+        "for the run; the configured database is never touched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1.0, help='Dataset size relative to the default (30,000 orders)')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per endpoint')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--latency-factor', type=float, default=1.0,
+                            help='Multiplier for the latency thresholds on slower machines; 0 skips latency checks')
+        parser.add_argument('--only', help='Run the endpoints whose name contains this text')
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this file')
+
+    def handle(self, *args, **options):
+        scenarios = [s for s in SCENARIOS if not options['only'] or options['only'] in s.name]
+        throttles = APIView.throttle_classes, AsyncReadView.throttle_classes
+        APIView.throttle_classes = AsyncReadView.throttle_classes = []
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.stdout.write(f'Seeding (scale {options["scale"]}) into {connection.settings_dict["NAME"]}...')
+            dataset = seed_dataset(options['scale'], options['seed'])
+            results, failures = self.run(dataset, scenarios, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            APIView.throttle_classes, AsyncReadView.throttle_classes = throttles
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as handle:
+                json.dump({'scale': options['scale'], 'results': results}, handle, indent=2)
+        if failures:
+            raise CommandError(f'{len(failures)} endpoint(s) over budget:\n' + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS(f'All {len(results)} endpoints within budget'))
+
+    def run(self, dataset, scenarios, options):
+        self.stdout.write(
+            f'{"endpoint":<30}{"method":<8}{"status":>7}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}'
+            f'{"queries":>9}{"alloc KB":>10}  result'
+        )
+        results, failures = [], []
+        for scenario, result, problems in run_suite(dataset, scenarios, options['iterations'], options['latency_factor']):
+            results.append(dict(result, failures=problems))
+            failures += [f'  {scenario.name}: {problem}' for problem in problems]
+            self.stdout.write(
+                f'{result["name"]:<30}{result["method"]:<8}{result["status"]:>7}{result["p50_ms"]:>9.2f}'
+                f'{result["p95_ms"]:>9.2f}{result["p99_ms"]:>9.2f}{result["queries"]:>9}{result["allocated_kb"]:>10.1f}  '
+                + (self.style.ERROR('; '.join(problems)) if problems else 'ok')
+            )
+        return results, failures
@@ -0,0 +1,65 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework_xml.renderers import XMLRenderer
+
+from Restaurants_api import read_serializers as read
+from Restaurants_api.management.seed import Rollback, seed_bench_data
+from Restaurants_api.models import MenuItem, Order
+from Restaurants_api.renderers import FastJSONRenderer, MessagePackRenderer
+
+
+RENDERERS = [
+    ('json', JSONRenderer()),
+    ('json (orjson)', FastJSONRenderer()),
+    ('xml', XMLRenderer()),
+    ('msgpack', MessagePackRenderer()),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Payload size and encode time of the menu item and order lists in each "
+        "response format. Seeds --items menu items and orders inside a "
+        "transaction that is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=2000)
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per case; the best is reported')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                user, category = seed_bench_data(options['items'])
+                payloads = [
+                    ('menu items', read.MenuItemReadSerializer(
+                        read.MenuItemReadSerializer.values(MenuItem.objects.filter(category=category)), many=True).data),
+                    ('orders', read.OrderReadSerializer(
+                        read.OrderReadSerializer.values(Order.objects.filter(user=user)), many=True).data),
+                ]
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(f'{"payload":<12} {"format":<14} {"bytes":>10} {"vs json":>8} {"encode ms":>10}')
+        for name, data in payloads:
+            baseline = None
+            for label, renderer in RENDERERS:
+                body = renderer.render(data, renderer.media_type, {})
+                baseline = baseline or len(body)
+                elapsed = self.best(lambda: renderer.render(data, renderer.media_type, {}), options['repeat'])
+                self.stdout.write(
+                    f'{name:<12} {label:<14} {len(body):>10} {len(body) / baseline:>7.0%} {elapsed * 1e3:>10.2f}'
+                )
+
+    @staticmethod
+    def best(func, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
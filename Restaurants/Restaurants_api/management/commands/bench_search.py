@@ -0,0 +1,97 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from Restaurants_api.management.benchmark import percentile
+from Restaurants_api.models import Category, MenuItem
+from Restaurants_api import search
+
+
+WORDS = (
+    'chicken beef lamb pork tofu paneer salmon prawn mushroom spinach lemon garlic ginger chilli '
+    'tikka masala curry korma biryani noodle ramen udon burger salad soup wrap taco risotto '
+    'pasta pizza dumpling skewer roasted grilled crispy smoked spicy sweet sour creamy classic'
+).split()
+
+QUERIES = [
+    ('word', 'chicken'),
+    ('two words', 'spicy ramen'),
+    ('prefix', 'dumpl'),
+    ('typo', 'chiken curyy'),
+    ('no match', 'xylophone'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed --items menu items into a fresh test database and time menu search "
+        "(the first page of ranked matches and their count) for a few kinds of query, "
+        "on the in-process index and, on PostgreSQL with pg_trgm, in the database. "
+        "The configured database is never touched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=100_000)
+        parser.add_argument('--iterations', type=int, default=20, help='Timed searches per query')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.stdout.write(f'Seeding {options["items"]:,} menu items into {connection.settings_dict["NAME"]}...')
+            self.seed(options['items'], options['seed'])
+            self.run(options['iterations'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    @staticmethod
+    def seed(count, seed):
+        rng = random.Random(seed)
+        categories = Category.objects.bulk_create(Category(slug=f'category-{i}', title=f'Category {i}') for i in range(50))
+        MenuItem.objects.bulk_create(
+            (
+                MenuItem(
+                    title=' '.join(rng.sample(WORDS, rng.randint(2, 4))) + f' {i}',
+                    price=Decimal(rng.randint(200, 5000)) / 100, featured=False, category=rng.choice(categories),
+                )
+                for i in range(count)
+            ),
+            batch_size=5000,
+        )
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE "Restaurants_api_menuitem"')
+
+    def run(self, iterations):
+        backends = [('memory', search.memory_search)]
+        if search.uses_database_search(connection.alias):
+            backends.append(('database', search.database_search))
+        else:
+            self.stdout.write('Database search skipped: needs PostgreSQL with the pg_trgm extension')
+
+        search.reset_index()
+        started = time.perf_counter()
+        search.get_index()
+        self.stdout.write(f'In-process index built in {(time.perf_counter() - started) * 1000:.0f} ms')
+
+        self.stdout.write(f'{"backend":<10}{"query":<12}{"matches":>9}{"p50 ms":>9}{"p95 ms":>9}')
+        for backend, run_search in backends:
+            for name, text in QUERIES:
+                def request():
+                    started = time.perf_counter()
+                    queryset = run_search(MenuItem.objects.all(), text)
+                    list(queryset.order_by('-rank', 'id')[:10])
+                    count = queryset.count()
+                    return count, time.perf_counter() - started
+
+                matches, _ = request()
+                latencies = sorted(request()[1] * 1000 for _ in range(iterations))
+                self.stdout.write(
+                    f'{backend:<10}{name:<12}{matches:>9}{percentile(latencies, 0.50):>9.2f}{percentile(latencies, 0.95):>9.2f}'
+                )
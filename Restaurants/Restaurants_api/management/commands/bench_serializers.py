@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from Restaurants_api import read_serializers as read
+from Restaurants_api.management.seed import Rollback, seed_bench_data
+from Restaurants_api.models import MenuItem, Category, Cart, Order
+from Restaurants_api.renderers import FastJSONRenderer
+from Restaurants_api.serializers import MenuItemSerializer, CategorySerializer, CartSerializer, OrderSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Per-item cost of rendering the list endpoints with the ModelSerializers and "
+        "JSONRenderer versus the .values() read serializers and FastJSONRenderer. "
+        "Seeds --items menu items, cart lines and orders inside a transaction that "
+        "is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=2000)
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per case; the best is reported')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.user, self.category = seed_bench_data(options['items'])
+                self.report(options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def report(self, repeat):
+        cases = [
+            ('menu items', MenuItemSerializer, read.MenuItemReadSerializer, lambda: MenuItem.objects.filter(category=self.category)),
+            ('categories', CategorySerializer, read.CategoryReadSerializer, lambda: Category.objects.all()),
+            ('cart', CartSerializer, read.CartReadSerializer, lambda: Cart.objects.filter(user=self.user)),
+            ('orders', OrderSerializer, read.OrderReadSerializer, lambda: Order.objects.filter(user=self.user)),
+        ]
+        self.stdout.write(f'{"endpoint":<12} {"rows":>6} {"before us/row":>14} {"after us/row":>13} {"speedup":>8}')
+        for name, serializer_class, read_class, queryset in cases:
+            def before():
+                rows = queryset().with_details() if serializer_class is OrderSerializer else queryset()
+                return JSONRenderer().render(serializer_class(rows, many=True).data)
+
+            def after():
+                return FastJSONRenderer().render(read_class(read_class.values(queryset()), many=True).data)
+
+            count = queryset().count()
+            slow, fast = self.best(before, repeat), self.best(after, repeat)
+            self.stdout.write(
+                f'{name:<12} {count:>6} {slow / count * 1e6:>14.2f} {fast / count * 1e6:>13.2f} {slow / fast:>7.1f}x'
+            )
+
+    @staticmethod
+    def best(func, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
@@ -0,0 +1,226 @@
+import asyncio
+import contextvars
+import json
+import random
+import threading
+import time
+import tracemalloc
+from datetime import date
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.core.management.base import BaseCommand
+from django.db import connection, connections, transaction
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.authtoken.models import Token
+from rest_framework.views import APIView
+
+from Restaurants_api import order_events, order_stream
+from Restaurants_api.asgi import get_asgi_application
+from Restaurants_api.async_views import AsyncReadView
+from Restaurants_api.management.benchmark import percentile
+from Restaurants_api.models import Order, OrderEvent
+from Restaurants_api.roles import MANAGER, DELIVERY_CREW
+from Restaurants_api.signals import order_events_recorded
+
+
+SAMPLE = 100
+
+
+class StreamClient:
+    """One SSE subscriber talking to the ASGI app directly, as a server would on its behalf."""
+
+    def __init__(self, application, token, query='', headers=(), path='/api/async/orders/stream'):
+        self.application = application
+        self.token = token
+        self.query = query
+        self.headers = list(headers)
+        self.path = path
+        self.status = None
+        self.events = []        # (event data, time received)
+        self.connected = asyncio.Event()
+        self.disconnected = asyncio.Event()
+        self.buffer = b''
+        self.task = None
+
+    def open(self):
+        # Each connection in a context of its own, as under a server: sharing the caller's would share asgiref's state
+        self.task = asyncio.create_task(self.run(), context=contextvars.Context())
+
+    async def run(self):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': self.path, 'raw_path': self.path.encode(),
+            'query_string': self.query.encode(), 'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+            'headers': [
+                (b'host', b'localhost'), (b'accept', b'text/event-stream'),
+                (b'authorization', f'Token {self.token}'.encode()), *self.headers,
+            ],
+        }
+        requested = False
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await self.disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        await self.application(scope, receive, self.send)
+        self.connected.set()    # also when the request failed
+
+    async def send(self, message):
+        if message['type'] == 'http.response.start':
+            self.status = message['status']
+            return
+        self.buffer += message.get('body', b'')
+        *blocks, self.buffer = self.buffer.split(b'\n\n')
+        for block in blocks:
+            if block.startswith(b'retry:'):
+                self.connected.set()
+            for line in block.split(b'\n'):
+                if line.startswith(b'data: '):
+                    self.events.append((json.loads(line[6:]), time.perf_counter()))
+
+    async def close(self):
+        self.disconnected.set()
+        await self.task
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the live order stream (api/async/orders/stream) in a fresh test database: "
+        "open --subscribers SSE connections through the ASGI app (customers, delivery crew and "
+        "managers), write --events order events from another thread, and report connection "
+        "cost, delivery latency and any missed or misrouted events. The configured database is "
+        "never touched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=2000)
+        parser.add_argument('--events', type=int, default=200)
+        parser.add_argument('--managers', type=int, default=5, help='Subscribers who are managers (receive every event)')
+        parser.add_argument('--crew', type=int, default=50, help='Subscribers who are delivery crew')
+        parser.add_argument('--rate', type=float, default=200, help='Events written per second')
+        parser.add_argument('--poll-only', action='store_true', help='Leave new events to the poll interval, as when another worker writes them')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        throttles = APIView.throttle_classes, AsyncReadView.throttle_classes
+        APIView.throttle_classes = AsyncReadView.throttle_classes = []
+        if options['poll_only']:
+            order_events.events_recorded.disconnect(order_events_recorded)
+        try:
+            self.stdout.write(f'Seeding {options["subscribers"]:,} subscribers into {connection.settings_dict["NAME"]}...')
+            users = self.seed(options['subscribers'], options['managers'], options['crew'])
+            asyncio.run(self.run(users, options))
+        finally:
+            APIView.throttle_classes, AsyncReadView.throttle_classes = throttles
+            order_events.events_recorded.connect(order_events_recorded)
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    @staticmethod
+    def seed(count, managers, crew):
+        """[(user id, role, token key)] with one open order per customer."""
+        unusable = make_password(None)
+        users = User.objects.bulk_create(User(username=f'user{i}', password=unusable) for i in range(count))
+        roles = [MANAGER] * managers + [DELIVERY_CREW] * crew
+        for name in (MANAGER, DELIVERY_CREW):
+            Group.objects.get_or_create(name=name)[0].user_set.add(*(u for u, role in zip(users, roles) if role == name))
+        tokens = Token.objects.bulk_create(Token(user=user, key=Token.generate_key()) for user in users)
+        customers = users[len(roles):]
+        Order.objects.bulk_create(
+            Order(user=customer, total=Decimal('10.00'), date=date.today()) for customer in customers
+        )
+        return [
+            (user.pk, roles[i] if i < len(roles) else None, token.key)
+            for i, (user, token) in enumerate(zip(users, tokens))
+        ]
+
+    async def run(self, users, options):
+        application = get_asgi_application()
+        rng = random.Random(options['seed'])
+        clients = {user_id: StreamClient(application, key) for user_id, _, key in users}
+
+        async def connect(batch):
+            for client in batch:
+                client.open()
+            await asyncio.gather(*(client.connected.wait() for client in batch))
+            await asyncio.sleep(0.5)    # let the connections settle into idling
+
+        # Memory is measured over the last SAMPLE connections only, as tracing slows everything down
+        batch, sample = list(clients.values())[:-SAMPLE], list(clients.values())[-SAMPLE:]
+        threads = threading.active_count()
+        started = time.perf_counter()
+        await connect(batch)
+        connect_s = time.perf_counter() - started - 0.5
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        await connect(sample)
+        per_stream = (tracemalloc.get_traced_memory()[0] - baseline) / len(sample)
+        tracemalloc.stop()
+        failed = sum(1 for client in clients.values() if client.status != 200)
+        self.stdout.write(
+            f'{len(clients):,} streams open ({failed} failed), the first {len(batch):,} in {connect_s:.2f} s; '
+            f'{per_stream / 1024:.1f} KB each, {threading.active_count() - threads} more threads'
+        )
+
+        crew = [user_id for user_id, role, _ in users if role == DELIVERY_CREW]
+        managers = [user_id for user_id, role, _ in users if role == MANAGER]
+        orders = await sync_to_async(lambda: list(Order.objects.values_list('id', 'user_id')))()
+        written = {}        # event id -> time committed
+        expected = {}       # event id -> subscriber ids that should receive it
+
+        def write(order_id, customer_id, crew_id, kind):
+            with transaction.atomic():
+                [event] = order_events.record(kind, [(order_id, customer_id, crew_id)])
+            return event.pk, time.perf_counter()
+
+        interval = 1 / options['rate']
+        for _ in range(options['events']):
+            order_id, customer_id = rng.choice(orders)
+            crew_id = rng.choice(crew) if crew else None
+            kind = rng.choice((OrderEvent.ASSIGNED, OrderEvent.DELIVERED))
+            event_id, committed = await sync_to_async(write)(order_id, customer_id, crew_id, kind)
+            written[event_id] = committed
+            expected[event_id] = {customer_id, *managers} | ({crew_id} if crew_id else set())
+            await asyncio.sleep(interval)
+
+        total = sum(len(recipients) for recipients in expected.values())
+        deadline = time.perf_counter() + 10
+        while sum(len(client.events) for client in clients.values()) < total and time.perf_counter() < deadline:
+            await asyncio.sleep(0.1)
+
+        latencies, unexpected = [], 0
+        received = {}
+        for user_id, client in clients.items():
+            for data, at in client.events:
+                received.setdefault(data['id'], set()).add(user_id)
+                if user_id not in expected.get(data['id'], ()):
+                    unexpected += 1
+                else:
+                    latencies.append((at - written[data['id']]) * 1000)
+        missing = sum(len(recipients - received.get(event_id, set())) for event_id, recipients in expected.items())
+        latencies.sort()
+
+        self.stdout.write(f'{len(written)} events, {total:,} deliveries expected, {missing} missing, {unexpected} unexpected')
+        if latencies:
+            self.stdout.write(
+                f'delivery latency ms: p50 {percentile(latencies, 0.50):.1f}  p95 {percentile(latencies, 0.95):.1f}  '
+                f'p99 {percentile(latencies, 0.99):.1f}  max {latencies[-1]:.1f}'
+            )
+
+        broker = order_stream.get_broker()
+        poller = broker.task
+        started = time.perf_counter()
+        await asyncio.gather(*(client.close() for client in clients.values()))
+        self.stdout.write(f'closed in {time.perf_counter() - started:.2f} s; {broker.count} subscriptions left')
+        if poller:
+            await poller
+        await sync_to_async(connections.close_all)()
@@ -0,0 +1,107 @@
+import multiprocessing
+import time
+from types import SimpleNamespace
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+from django.core.management.base import BaseCommand
+from rest_framework.throttling import UserRateThrottle
+
+from Restaurants_api.throttles import GCRAThrottle
+
+
+RATES = ['10/minute', '1000/minute', '100000/hour']
+
+
+def history_throttle(cache, rate):
+    """DRF's SimpleRateThrottle, keeping every request timestamp in the window."""
+    return type('HistoryThrottle', (UserRateThrottle,), {'cache': cache, 'rate': rate})
+
+
+def gcra_throttle(cache, rate, timer=time.time):
+    return type('BenchGCRAThrottle', (GCRAThrottle,), {
+        'get_cache': lambda self: cache,
+        'get_rate': lambda self, scope: rate,
+        'timer': staticmethod(timer),
+    })
+
+
+def client_request():
+    return SimpleNamespace(user=SimpleNamespace(is_authenticated=True, pk=1), META={}, method='GET')
+
+
+class Command(BaseCommand):
+    help = (
+        "Time per throttle check of DRF's timestamp-history throttle against the "
+        "GCRA throttle, for small and large rates, on the local-memory cache and "
+        "(with --redis-url) on Redis. With Redis, also forks --processes workers "
+        "sharing one client's bucket and checks that exactly the limit is admitted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5000, help='Checks per case, all from one client')
+        parser.add_argument('--redis-url', help='e.g. redis://127.0.0.1:6379/0')
+        parser.add_argument('--processes', type=int, default=8)
+
+    def handle(self, *args, **options):
+        backends = [('locmem', LocMemCache('bench-throttles', {}))]
+        if options['redis_url']:
+            backends.append(('redis', RedisCache(options['redis_url'], {})))
+
+        self.stdout.write(f'{"cache":<8} {"throttle":<9} {"rate":<13} {"allowed":>8} {"us/check":>9} {"state bytes":>12}')
+        for backend, cache in backends:
+            for rate in RATES:
+                for kind, make in (('history', history_throttle), ('gcra', gcra_throttle)):
+                    cache.clear()
+                    allowed, elapsed = self.run(make(cache, rate), options['requests'])
+                    size = sum(len(repr(cache.get(key))) for key in self.keys(cache))
+                    self.stdout.write(
+                        f'{backend:<8} {kind:<9} {rate:<13} {allowed:>8} '
+                        f'{elapsed / options["requests"] * 1e6:>9.1f} {size:>12}'
+                    )
+
+        if options['redis_url']:
+            self.check_processes(backends[1][1], options['processes'], options['requests'])
+
+    @staticmethod
+    def run(throttle_class, requests):
+        request, view = client_request(), SimpleNamespace()
+        allowed = 0
+        start = time.perf_counter()
+        for _ in range(requests):
+            allowed += throttle_class().allow_request(request, view)
+        return allowed, time.perf_counter() - start
+
+    @staticmethod
+    def keys(cache):
+        if isinstance(cache, RedisCache):
+            return [key.decode().split(':', 2)[-1] for key in cache._cache.get_client().keys('*')]
+        return [key.split(':', 2)[-1] for key in cache._cache]
+
+    def check_processes(self, cache, processes, requests):
+        per_process = requests // processes
+        limit = per_process * processes // 2
+        now = time.time()
+        throttle_class = gcra_throttle(cache, f'{limit}/hour', timer=lambda: now)     # no refill during the run
+        cache.clear()
+
+        context = multiprocessing.get_context('fork')
+        counts = context.Queue()
+
+        def work():
+            counts.put(self.run(throttle_class, per_process)[0])
+
+        workers = [context.Process(target=work) for _ in range(processes)]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        allowed = sum(counts.get() for _ in workers)
+        elapsed = time.perf_counter() - start
+        for worker in workers:
+            worker.join()
+
+        style = self.style.SUCCESS if allowed == limit else self.style.ERROR
+        self.stdout.write(style(
+            f'{processes} processes x {per_process} checks at {limit}/hour: {allowed} allowed '
+            f'(expected {limit}), {per_process * processes / elapsed:,.0f} checks/s'
+        ))
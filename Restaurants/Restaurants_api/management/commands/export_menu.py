@@ -0,0 +1,22 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from Restaurants_api.menu_io import FORMATS, export_menu_items
+
+
+class Command(BaseCommand):
+    help = "Write every menu item as CSV or NDJSON, in the format read by import_menu."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(FORMATS), default='csv')
+        parser.add_argument('--output', '-o', help='File to write (default: stdout)')
+
+    def handle(self, *args, **options):
+        handle = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else sys.stdout
+        try:
+            for chunk in export_menu_items(options['format']):
+                handle.write(chunk)
+        finally:
+            if handle is not sys.stdout:
+                handle.close()
@@ -0,0 +1,42 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Restaurants_api.menu_io import FORMATS, BATCH_SIZE, UnreadableInput, read_rows, text_lines, import_menu_items
+
+
+class Command(BaseCommand):
+    help = (
+        "Create or update menu items from a CSV or NDJSON file (id, title, price, "
+        "featured, category slug). The file is streamed and written in batches; "
+        "invalid rows are reported by line and skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=list(FORMATS), help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or os.path.splitext(options['path'])[1].lstrip('.').lower()
+        if fmt not in FORMATS:
+            raise CommandError(f'Cannot tell the format of {options["path"]}; pass --format csv or --format ndjson.')
+
+        unreadable = None
+        try:
+            with open(options['path'], 'rb') as handle:
+                report = import_menu_items(read_rows(text_lines(handle), fmt), batch_size=options['batch_size'])
+        except OSError as e:
+            raise CommandError(str(e))
+        except UnreadableInput as e:
+            unreadable, report = e, e.report
+
+        for error in report['errors']:
+            self.stderr.write(f'line {error["line"]}: {error["errors"]}')
+        if report['error_count'] > len(report['errors']):
+            self.stderr.write(f'... {report["error_count"] - len(report["errors"])} more errors not shown')
+        self.stdout.write(self.style.SUCCESS(
+            f'{report["created"]} created, {report["updated"]} updated, {report["error_count"]} rejected'
+        ))
+        if unreadable is not None:
+            raise CommandError(f'Stopped at line {unreadable.line}: {unreadable.message}')
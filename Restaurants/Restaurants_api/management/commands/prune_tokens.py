@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired JWTs from the token blacklist tables (OutstandingToken "
+        "and BlacklistedToken) in batches, each in its own short transaction, "
+        "so the tables stop growing without holding long locks. An expired "
+        "token can no longer be used, blacklisted or not."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--pause', type=float, default=0.0, help='Seconds to sleep between batches')
+
+    def handle(self, *args, **options):
+        cutoff = aware_utcnow()
+        outstanding = blacklisted = 0
+        while True:
+            with transaction.atomic():
+                ids = list(
+                    OutstandingToken.objects.filter(expires_at__lte=cutoff)
+                    .order_by('id').values_list('id', flat=True)[:options['batch_size']]
+                )
+                if not ids:
+                    break
+                blacklisted += BlacklistedToken.objects.filter(token_id__in=ids).delete()[0]
+                outstanding += OutstandingToken.objects.filter(id__in=ids).delete()[0]
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Pruned {outstanding} expired outstanding tokens, {blacklisted} of them blacklisted'
+        ))
@@ -0,0 +1,34 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+
+from Restaurants_api.models import MenuItem, Category, Cart, Order, OrderItem
+
+
+class Rollback(Exception):
+    """Raised inside transaction.atomic() to discard seeded benchmark data."""
+
+
+def seed_bench_data(count, prefix='bench'):
+    """
+    Adds `count` menu items in one category, a user with every item in their
+    cart and count // 3 orders of three items each. Returns (user, category).
+    """
+    category = Category.objects.create(slug=prefix, title=prefix.title())
+    items = MenuItem.objects.bulk_create(
+        MenuItem(title=f'{prefix.title()} item {i}', price=Decimal('5.00') + i % 50, featured=False, category=category)
+        for i in range(count)
+    )
+    user = User.objects.create_user(username=f'{prefix}-customer')
+    Cart.objects.bulk_create(
+        Cart(user=user, menuitem=item, quantity=2, unit_price=item.price, price=item.price * 2) for item in items
+    )
+    orders = Order.objects.bulk_create(
+        Order(user=user, total=Decimal('30.00'), date=date.today()) for _ in range(count // 3)
+    )
+    OrderItem.objects.bulk_create(
+        OrderItem(order=order, menuitem=item, quantity=1, unit_price=item.price, total_price=item.price)
+        for n, order in enumerate(orders) for item in items[n * 3:n * 3 + 3]
+    )
+    return user, category
@@ -0,0 +1,34 @@
+"""
+Query-string filters for the menu item listing (sync and async views).
+
+`category` and `category_slug` take comma-separated lists, so one request can
+browse several categories; `min_price`/`max_price` bound the price. The
+(category, price, id) index serves a category with a price range in price
+order, and the partial index on featured rows serves `featured=true`.
+No filter here queries the database to validate its value.
+"""
+
+import django_filters
+
+from .models import MenuItem
+
+
+class NumberInFilter(django_filters.BaseInFilter, django_filters.NumberFilter):
+    pass
+
+
+class CharInFilter(django_filters.BaseInFilter, django_filters.CharFilter):
+    pass
+
+
+class MenuItemFilter(django_filters.FilterSet):
+    category = NumberInFilter(field_name='category', lookup_expr='in')
+    category_slug = CharInFilter(field_name='category__slug', lookup_expr='in')
+    price = django_filters.NumberFilter(field_name='price')
+    min_price = django_filters.NumberFilter(field_name='price', lookup_expr='gte')
+    max_price = django_filters.NumberFilter(field_name='price', lookup_expr='lte')
+    featured = django_filters.BooleanFilter(field_name='featured')
+
+    class Meta:
+        model = MenuItem
+        fields = ['category', 'category_slug', 'price', 'min_price', 'max_price', 'featured']
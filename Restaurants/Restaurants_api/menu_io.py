@@ -0,0 +1,257 @@
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import MenuItem, Category
+from .response_cache import bump_version
+
+
+FIELDS = ['id', 'title', 'price', 'featured', 'category']
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+
+TRUE_VALUES = {'1', 'true', 't', 'yes', 'y'}
+FALSE_VALUES = {'0', 'false', 'f', 'no', 'n', ''}
+
+
+"""  Reading  """
+class UnreadableInput(Exception):
+    """The body is not valid UTF-8, or not valid CSV, from `line` on; `report` is filled in by the import."""
+
+    def __init__(self, line, message):
+        super().__init__(message)
+        self.line = line
+        self.message = message
+        self.report = None
+
+
+def format_for_content_type(content_type):
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    if content_type in ('text/csv', 'application/csv'):
+        return 'csv'
+    if content_type in ('application/x-ndjson', 'application/ndjson', 'application/jsonl', 'application/x-jsonlines'):
+        return 'ndjson'
+    return None
+
+
+def read_rows(lines, fmt):
+    """Yields (line number, row dict or error message) from an iterable of text lines."""
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        try:
+            for row in reader:
+                yield reader.line_num, row
+        except csv.Error as exc:
+            # DictReader.line_num only moves on rows that parse
+            raise UnreadableInput(reader.reader.line_num, f'Invalid CSV: {exc}.')
+        return
+
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield number, 'Invalid JSON'
+            continue
+        yield number, row if isinstance(row, dict) else 'Expected a JSON object'
+
+
+def text_lines(stream):
+    """Decodes a binary stream line by line without reading it whole."""
+    # b'\n' never occurs inside a UTF-8 sequence, so each line decodes on its own
+    for number, line in enumerate(iter(stream.readline, b''), start=1):
+        try:
+            yield line.decode('utf-8-sig' if number == 1 else 'utf-8')
+        except UnicodeDecodeError:
+            raise UnreadableInput(number, 'Invalid UTF-8.')
+
+
+"""  Validation  """
+def clean_row(row):
+    """Returns (values, errors) for one row; category stays a slug here."""
+    errors = {}
+    values = {}
+
+    raw_id = row.get('id')
+    if raw_id not in (None, ''):
+        try:
+            values['id'] = int(raw_id)
+        except (TypeError, ValueError):
+            errors['id'] = ['A valid integer is required.']
+
+    title = str(row.get('title') or '').strip()
+    if not title:
+        errors['title'] = ['This field is required.']
+    elif len(title) > 255:
+        errors['title'] = ['Ensure this field has no more than 255 characters.']
+    values['title'] = title
+
+    try:
+        price = Decimal(str(row.get('price')).strip())
+        if not price.is_finite():
+            raise InvalidOperation
+    except (InvalidOperation, ValueError):
+        errors['price'] = ['A valid number is required.']
+    else:
+        if price < 2:
+            errors['price'] = ['price less than 2.00']
+        elif price.as_tuple().exponent < -2 or price >= Decimal('10000'):
+            errors['price'] = ['Ensure that there are no more than 6 digits in total, 2 after the decimal point.']
+        values['price'] = price.quantize(Decimal('0.01'))
+
+    featured = row.get('featured', False)
+    if isinstance(featured, bool):
+        values['featured'] = featured
+    elif str(featured).strip().lower() in TRUE_VALUES:
+        values['featured'] = True
+    elif str(featured).strip().lower() in FALSE_VALUES or featured is None:
+        values['featured'] = False
+    else:
+        errors['featured'] = ['Must be a valid boolean.']
+
+    slug = str(row.get('category') or '').strip()
+    if not slug:
+        errors['category'] = ['This field is required.']
+    values['category'] = slug
+
+    return values, errors
+
+
+"""  Import  """
+def import_menu_items(rows, batch_size=BATCH_SIZE):
+    """
+    Creates or updates menu items from (line, row) pairs. Rows with an id
+    update that item, others are created. Work is done batch by batch: one
+    query resolves the batch's category slugs, one loads the items it
+    updates, then bulk_create/bulk_update write it. Invalid rows are
+    reported and skipped; valid rows in the same batch are still written.
+    Unreadable input ends the import: the rows before it are written, then
+    UnreadableInput is raised with the report, which lists its line.
+    """
+    report = {'created': 0, 'updated': 0, 'error_count': 0, 'errors': []}
+    featured_id = None
+    rows = iter(rows)
+    unreadable = None
+
+    while unreadable is None:
+        batch, unreadable = _read_batch(rows, batch_size)
+        if not batch:
+            break
+
+        cleaned = []
+        for line, row in batch:
+            if isinstance(row, str):
+                _report_error(report, line, {'non_field_errors': [row]})
+                continue
+            values, errors = clean_row(row)
+            if errors:
+                _report_error(report, line, errors)
+            else:
+                cleaned.append((line, values))
+
+        slugs = {values['category'] for _, values in cleaned}
+        categories = {}
+        for pk, slug in Category.objects.filter(slug__in=slugs).order_by('-id').values_list('id', 'slug'):
+            categories[slug] = pk    # the oldest category wins when slugs repeat
+        existing = MenuItem.objects.in_bulk([values['id'] for _, values in cleaned if 'id' in values])
+
+        to_create, to_update = [], []
+        for line, values in cleaned:
+            category_id = categories.get(values['category'])
+            if category_id is None:
+                _report_error(report, line, {'category': [f'No category with slug "{values["category"]}".']})
+                continue
+            if 'id' in values:
+                item = existing.get(values['id'])
+                if item is None:
+                    _report_error(report, line, {'id': [f'No menu item with id {values["id"]}.']})
+                    continue
+            else:
+                item = MenuItem()
+            item.title, item.price, item.featured = values['title'], values['price'], values['featured']
+            item.category_id = category_id
+            item.updated_at = timezone.now()
+            (to_update if item.pk else to_create).append(item)
+
+        with transaction.atomic():
+            MenuItem.objects.bulk_create(to_create)
+            MenuItem.objects.bulk_update(to_update, ['title', 'price', 'featured', 'category', 'updated_at'])
+        report['created'] += len(to_create)
+        report['updated'] += len(to_update)
+
+        for item in to_create + to_update:
+            if item.featured:
+                featured_id = item.pk
+
+    # Keep a single item of the day: the last featured row imported wins
+    if featured_id is not None:
+        MenuItem.objects.filter(featured=True).exclude(pk=featured_id).update(featured=False, updated_at=timezone.now())
+    if report['created'] or report['updated']:
+        bump_version()    # bulk writes skip the post_save signal
+    if unreadable is not None:
+        _report_error(report, unreadable.line, {'non_field_errors': [unreadable.message]})
+        unreadable.report = report
+        raise unreadable
+    return report
+
+
+def _read_batch(rows, size):
+    """Up to `size` rows, and the UnreadableInput that cut them short, if any."""
+    batch = []
+    try:
+        for row in islice(rows, size):
+            batch.append(row)
+    except UnreadableInput as exc:
+        return batch, exc
+    return batch, None
+
+
+def _report_error(report, line, errors):
+    report['error_count'] += 1
+    if len(report['errors']) < MAX_REPORTED_ERRORS:
+        report['errors'].append({'line': line, 'errors': errors})
+
+
+"""  Export  """
+def stream_records(rows, fields, fmt, flush_at=64 * 1024):
+    """
+    Renders tuples aligned with `fields` as CSV (with a header) or NDJSON and
+    yields the text in ~64KB chunks, so memory stays flat however many rows
+    the iterable produces.
+    """
+    buffer = io.StringIO()
+    if fmt == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        write = writer.writerow
+    else:
+        def write(row):
+            buffer.write(json.dumps(dict(zip(fields, row)), default=str) + '\n')
+
+    for row in rows:
+        write(row)
+        if buffer.tell() >= flush_at:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_menu_items(fmt, chunk_size=2000):
+    """Yields the whole catalogue as CSV or NDJSON text, streaming from a server-side cursor."""
+    rows = (
+        MenuItem.objects.order_by('id')
+        .values_list(*FIELDS[:-1], 'category__slug')
+        .iterator(chunk_size=chunk_size)
+    )
+    return stream_records(rows, FIELDS, fmt)
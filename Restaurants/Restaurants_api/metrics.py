@@ -0,0 +1,289 @@
+"""
+Request metrics shared across worker processes.
+
+Each process counts into per-thread shards, so recording never takes a lock
+and never loses an update. Every FLUSH_INTERVAL seconds (and at exit) one
+thread merges the shards and atomically rewrites the process's own file in
+METRICS_DIR; /metrics sums every file there. Counters are cumulative, so
+finished workers keep contributing, as Prometheus expects: each new registry
+folds the files of this host's finished processes into COMPACTED, which keeps
+the directory at about one file per live worker.
+"""
+
+import atexit
+import glob
+import json
+import os
+import socket
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import fcntl
+except ImportError:     # Windows: finished workers' files are left as they are
+    fcntl = None
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+FLUSH_INTERVAL = 5.0
+COMPACTED = 'compacted.json'
+HOST = socket.gethostname()
+
+
+def default_directory():
+    directory = getattr(settings, 'METRICS_DIR', None)
+    if not directory:
+        raise ImproperlyConfigured('REQUEST_METRICS needs METRICS_DIR, a directory shared by the worker processes.')
+    return directory
+
+
+"""  Recording  """
+class Series:
+    """Counts for one (url name, method) pair in one thread."""
+    __slots__ = ('requests', 'client_errors', 'server_errors', 'latency_sum', 'latency_buckets', 'query_sum', 'query_buckets')
+
+    def __init__(self):
+        self.requests = self.client_errors = self.server_errors = self.query_sum = 0
+        self.latency_sum = 0.0
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.query_buckets = [0] * (len(QUERY_BUCKETS) + 1)
+
+    def as_list(self):
+        return [
+            self.requests, self.client_errors, self.server_errors, self.latency_sum,
+            list(self.latency_buckets), self.query_sum, list(self.query_buckets),
+        ]
+
+
+def merge(total, values):
+    """Adds one as_list() snapshot into another, in place."""
+    for index, value in enumerate(values):
+        if isinstance(value, list):
+            total[index] = [a + b for a, b in zip(total[index], value)]
+        else:
+            total[index] += value
+
+
+class MetricsRegistry:
+    def __init__(self, directory):
+        self.directory = directory
+        self._flush_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        compact(directory)
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+        atexit.register(self.flush)
+
+    def _reset(self):
+        # A fresh file and fresh shards per process (also after a fork)
+        self.path = os.path.join(self.directory, f'{HOST}-{os.getpid()}-{time.time_ns()}.json')
+        self._local = threading.local()
+        self._shards = []
+        self._next_flush = time.monotonic() + FLUSH_INTERVAL
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            self._shards.append(shard)
+        return shard
+
+    def record(self, url_name, method, status, seconds, queries):
+        shard = self._shard()
+        series = shard.get((url_name, method))
+        if series is None:
+            series = shard[(url_name, method)] = Series()
+        series.requests += 1
+        if status >= 500:
+            series.server_errors += 1
+        elif status >= 400:
+            series.client_errors += 1
+        series.latency_sum += seconds
+        series.latency_buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        series.query_sum += queries
+        series.query_buckets[bisect_left(QUERY_BUCKETS, queries)] += 1
+
+        if time.monotonic() >= self._next_flush:
+            self.flush(blocking=False)
+
+    def snapshot(self):
+        """This process's totals, merged across threads."""
+        totals = {}
+        for shard in list(self._shards):
+            for key, series in list(shard.items()):
+                if key in totals:
+                    merge(totals[key], series.as_list())
+                else:
+                    totals[key] = series.as_list()
+        return totals
+
+    def flush(self, blocking=True):
+        # Only flushing is serialised, and a busy flush is simply skipped
+        if not self._flush_lock.acquire(blocking=blocking):
+            return
+        try:
+            self._next_flush = time.monotonic() + FLUSH_INTERVAL
+            rows = [[url_name, method, values] for (url_name, method), values in self.snapshot().items()]
+            if rows:
+                _write(self.path, rows)
+        except FileNotFoundError:
+            pass    # the directory was removed: stay out of it rather than recreate it
+        finally:
+            self._flush_lock.release()
+
+
+def _write(path, data):
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as handle:
+        json.dump(data, handle)
+    os.replace(temporary, path)
+
+
+def _read(path):
+    try:
+        with open(path) as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _finished(name):
+    """Whether process file `name` belongs to a process on this host that has exited."""
+    owner = name.removesuffix('.tmp').removesuffix('.json').rpartition('-')[0]
+    host, _, pid = owner.rpartition('-')
+    if host != HOST or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        pass
+    return False
+
+
+def _compacted(directory):
+    return _read(os.path.join(directory, COMPACTED)) or {'absorbed': [], 'rows': []}
+
+
+def compact(directory):
+    """
+    Adds the files of this host's finished processes to COMPACTED and removes
+    them. COMPACTED lists the files it has absorbed until the next compaction,
+    so collect() never counts one twice, even when removing them is cut short.
+    """
+    if fcntl is None:
+        return
+    with open(os.path.join(directory, '.compact.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        compacted = _compacted(directory)
+        for name in compacted['absorbed']:
+            _remove(os.path.join(directory, name))
+        totals = {(url_name, method): values for url_name, method, values in compacted['rows']}
+        absorbed = []
+        for path in glob.glob(os.path.join(directory, '*.json*')):
+            name = os.path.basename(path)
+            if name == COMPACTED or not _finished(name):
+                continue
+            if name.endswith('.tmp'):
+                _remove(path)
+                continue
+            for url_name, method, values in _read(path) or []:
+                if (url_name, method) in totals:
+                    merge(totals[(url_name, method)], values)
+                else:
+                    totals[(url_name, method)] = values
+            absorbed.append(name)
+        if absorbed:
+            rows = [[url_name, method, values] for (url_name, method), values in totals.items()]
+            _write(os.path.join(directory, COMPACTED), {'absorbed': absorbed, 'rows': rows})
+            for name in absorbed:
+                _remove(os.path.join(directory, name))
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(directory=None):
+    directory = directory or default_directory()
+    registry = _registries.get(directory)
+    if registry is None:
+        with _registries_lock:
+            registry = _registries.get(directory)
+            if registry is None:
+                registry = _registries[directory] = MetricsRegistry(directory)
+    return registry
+
+
+"""  Exposition  """
+def collect(directory=None):
+    """Totals per (url name, method) across every process file in `directory`."""
+    directory = directory or default_directory()
+    files = {
+        os.path.basename(path): _read(path) or []
+        for path in glob.glob(os.path.join(directory, '*.json'))
+    }
+    # Read after the process files: a file absorbed meanwhile is then in these totals, and skipped
+    compacted = _compacted(directory)
+    sources = [rows for name, rows in files.items() if name not in {COMPACTED, *compacted['absorbed']}]
+    totals = {}
+    for rows in [compacted['rows'], *sources]:
+        for url_name, method, values in rows:
+            key = (url_name, method)
+            if key in totals:
+                merge(totals[key], values)
+            else:
+                totals[key] = values
+    return totals
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _histogram(lines, name, help_text, bounds, totals, buckets_index, sum_index):
+    lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+    for (url_name, method), values in sorted(totals.items()):
+        cumulative = 0
+        for bound, count in zip([*bounds, '+Inf'], values[buckets_index]):
+            cumulative += count
+            lines.append(f'{name}_bucket{_labels(url_name=url_name, method=method, le=bound)} {cumulative}')
+        lines.append(f'{name}_sum{_labels(url_name=url_name, method=method)} {values[sum_index]}')
+        lines.append(f'{name}_count{_labels(url_name=url_name, method=method)} {values[0]}')
+
+
+def render_prometheus(totals):
+    """Prometheus text exposition format (version 0.0.4)."""
+    lines = [
+        '# HELP restaurants_http_requests_total Requests handled, by URL name and method.',
+        '# TYPE restaurants_http_requests_total counter',
+    ]
+    for (url_name, method), values in sorted(totals.items()):
+        lines.append(f'restaurants_http_requests_total{_labels(url_name=url_name, method=method)} {values[0]}')
+
+    lines += [
+        '# HELP restaurants_http_errors_total Responses with a 4xx or 5xx status, by URL name, method and status class.',
+        '# TYPE restaurants_http_errors_total counter',
+    ]
+    for (url_name, method), values in sorted(totals.items()):
+        lines.append(f'restaurants_http_errors_total{_labels(url_name=url_name, method=method, status_class="4xx")} {values[1]}')
+        lines.append(f'restaurants_http_errors_total{_labels(url_name=url_name, method=method, status_class="5xx")} {values[2]}')
+
+    _histogram(lines, 'restaurants_http_request_duration_seconds', 'Time to produce the response.', LATENCY_BUCKETS, totals, 4, 3)
+    _histogram(lines, 'restaurants_http_request_queries', 'Database queries per request.', QUERY_BUCKETS, totals, 6, 5)
+    return '\n'.join(lines) + '\n'
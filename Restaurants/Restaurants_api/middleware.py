@@ -0,0 +1,227 @@
+import contextvars
+import json
+import logging
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import metrics
+
+
+logger = logging.getLogger('Restaurants_api.profiling')
+
+_current = contextvars.ContextVar('request_profile', default=None)
+DRF_PHASES = ('auth', 'permissions', 'throttle', 'handler', 'render')
+
+
+"""  Per-request profile  """
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.phases = {}
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def finish(self, request, response):
+        total = time.perf_counter() - self.started
+        drf = self.phases.pop('drf', None)
+        if drf is not None:
+            # The view's own work: dispatch minus the checks DRF runs first
+            self.phases['handler'] = drf - sum(self.phases.get(phase, 0.0) for phase in ('auth', 'permissions', 'throttle'))
+
+        metrics = [('db', self.db_time, f'{self.queries} queries')]
+        metrics += [(phase, self.phases[phase], None) for phase in DRF_PHASES if phase in self.phases]
+        metrics.append(('total', total, None))
+        response['Server-Timing'] = ', '.join(
+            f'{name};dur={seconds * 1000:.2f}' + (f';desc="{desc}"' if desc else '')
+            for name, seconds, desc in metrics
+        )
+
+        size = None if response.streaming else len(response.content)
+        logger.info(json.dumps({
+            'view': view_name(request),
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'db_ms': round(self.db_time * 1000, 2),
+            'queries': self.queries,
+            'phases_ms': {phase: round(self.phases[phase] * 1000, 2) for phase in DRF_PHASES if phase in self.phases},
+            'response_bytes': size,
+        }))
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    view = getattr(match.func, 'view_class', None) or getattr(match.func, 'cls', None) or match.func
+    return view.__name__
+
+
+"""  Instrumentation (installed once, only when profiling is enabled)  """
+def _timed(phase, func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return func(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.add(phase, time.perf_counter() - started)
+    return wrapper
+
+
+def _count_queries(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.queries += 1
+        profile.db_time += time.perf_counter() - started
+
+
+def _watch_connection(connection, **kwargs):
+    if _count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_queries)
+
+
+_installed = set()
+
+
+def install_query_counter():
+    if 'queries' in _installed:
+        return
+    _installed.add('queries')
+    # Queries may run on any thread's connection (sync_to_async), so watch them all
+    connection_created.connect(_watch_connection)
+    for connection in connections.all(initialized_only=True):
+        _watch_connection(connection)
+
+
+def install():
+    install_query_counter()
+    if 'drf' in _installed:
+        return
+    _installed.add('drf')
+    APIView.perform_authentication = _timed('auth', APIView.perform_authentication)
+    APIView.check_permissions = _timed('permissions', APIView.check_permissions)
+    APIView.check_throttles = _timed('throttle', APIView.check_throttles)
+    APIView.dispatch = _timed('drf', APIView.dispatch)
+    Response.rendered_content = property(_timed('render', Response.rendered_content.fget))
+
+
+"""  Middleware  """
+class RequestProfilingMiddleware:
+    """
+    With settings.REQUEST_PROFILING on, adds a Server-Timing header to every
+    response (query count and DB time, DRF authentication/permission/throttle
+    checks, the view handler, rendering and the total) and logs the same
+    figures plus the response size as one JSON line on the
+    'Restaurants_api.profiling' logger, keyed by view class name. When the
+    setting is off Django drops the middleware at startup, so it costs nothing.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_PROFILING', False):
+            raise MiddlewareNotUsed
+        install()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        profile.finish(request, response)
+        return response
+
+    async def __acall__(self, request):
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        profile.finish(request, response)
+        return response
+
+
+class RequestMetricsMiddleware:
+    """
+    With settings.REQUEST_METRICS on, counts every request into the shared
+    metrics store (see metrics.py) by URL name and method: status class,
+    latency and query count. Served at /metrics.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_METRICS', False):
+            raise MiddlewareNotUsed
+        install_query_counter()
+        self.registry = metrics.get_registry()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile, token = self.start()
+        queries, started = profile.queries, time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                _current.reset(token)
+        self.record(request, response, time.perf_counter() - started, profile.queries - queries)
+        return response
+
+    async def __acall__(self, request):
+        profile, token = self.start()
+        queries, started = profile.queries, time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token is not None:
+                _current.reset(token)
+        self.record(request, response, time.perf_counter() - started, profile.queries - queries)
+        return response
+
+    @staticmethod
+    def start():
+        # Share the profiling middleware's counters when it is on
+        profile = _current.get()
+        if profile is not None:
+            return profile, None
+        profile = RequestProfile()
+        return profile, _current.set(profile)
+
+    def record(self, request, response, seconds, queries):
+        match = getattr(request, 'resolver_match', None)
+        url_name = (match.url_name if match else None) or 'unmatched'
+        self.registry.record(url_name, request.method, response.status_code, seconds, queries)
@@ -0,0 +1,46 @@
+from django.db import migrations
+
+
+# Menu search (search.py) runs in the database on PostgreSQL with pg_trgm; elsewhere
+# it uses an in-process index and these are skipped. The full-text expression must
+# stay identical to SearchVector('title', config=SEARCH_CONFIG).
+INDEXES = {
+    'menuitem_title_search_idx': (
+        'CREATE INDEX IF NOT EXISTS menuitem_title_search_idx ON "Restaurants_api_menuitem" '
+        'USING gin (to_tsvector(\'english\'::regconfig, COALESCE("title", \'\')))'
+    ),
+    'menuitem_title_trgm_idx': (
+        'CREATE INDEX IF NOT EXISTS menuitem_title_trgm_idx ON "Restaurants_api_menuitem" '
+        'USING gin ("title" gin_trgm_ops)'
+    ),
+}
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for sql in INDEXES.values():
+        schema_editor.execute(sql)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Restaurants_api', '0004_tokenversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
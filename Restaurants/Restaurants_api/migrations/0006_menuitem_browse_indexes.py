@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-17 19:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Restaurants_api', '0005_menuitem_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(fields=['category', 'price', 'id'], name='menuitem_category_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(condition=models.Q(('featured', True)), fields=['id'], name='menuitem_featured_idx'),
+        ),
+        migrations.AlterField(
+            model_name='menuitem',
+            name='category',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, to='Restaurants_api.category'),
+        ),
+        migrations.AlterField(
+            model_name='menuitem',
+            name='featured',
+            field=models.BooleanField(),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-17 19:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Restaurants_api', '0006_menuitem_browse_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('delivery_crew__isnull', True), ('status', False)), fields=['id'], name='order_unassigned_idx'),
+        ),
+    ]
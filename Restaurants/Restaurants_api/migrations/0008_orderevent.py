@@ -0,0 +1,30 @@
+# Generated by Django 5.2.1 on 2026-10-17 19:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Restaurants_api', '0007_order_unassigned_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('created', 'Created'), ('assigned', 'Assigned'), ('delivered', 'Delivered')], max_length=16)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('customer', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('delivery_crew', models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='Restaurants_api.order')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['customer', 'id'], name='orderevent_customer_idx'), models.Index(fields=['delivery_crew', 'id'], name='orderevent_crew_idx')],
+            },
+        ),
+    ]
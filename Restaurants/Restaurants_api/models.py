@@ -4,6 +4,7 @@ from django.contrib.auth.models import User
 class Category(models.Model):
     slug = models.SlugField()
     title = models.CharField(max_length=255, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"{self.title}"
@@ -11,8 +12,20 @@ class Category(models.Model):
 class MenuItem(models.Model):
     title = models.CharField(max_length=255, db_index=True)
     price = models.DecimalField(max_digits=6, decimal_places=2, db_index=True)
-    featured = models.BooleanField(db_index=True)
-    category = models.ForeignKey(Category, on_delete=models.PROTECT)
+    featured = models.BooleanField()
+    # Indexed by menuitem_category_price_idx, which leads with it
+    category = models.ForeignKey(Category, on_delete=models.PROTECT, db_index=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination seeks on (price, id) when ordering by price
+            models.Index(fields=['price', 'id'], name='menuitem_price_id_idx'),
+            # A category (or several) within a price range, in price order
+            models.Index(fields=['category', 'price', 'id'], name='menuitem_category_price_idx'),
+            # Only the item of the day is featured, so only its row is indexed
+            models.Index(fields=['id'], condition=models.Q(featured=True), name='menuitem_featured_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} : ${self.price}"
@@ -28,12 +41,28 @@ class Cart(models.Model):
     class Meta:
         unique_together = ('menuitem', 'user')
 
+class OrderQuerySet(models.QuerySet):
+    def with_details(self):
+        # Everything OrderSerializer touches, in three queries however many orders
+        return self.select_related('user').prefetch_related(
+            models.Prefetch('orderitem_set', queryset=OrderItem.objects.select_related('menuitem').order_by('id'))
+        )
+
 class Order(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     delivery_crew = models.ForeignKey(User, on_delete=models.SET_NULL, related_name="delivery_crew", null=True)
     status = models.BooleanField(db_index=True, default=0)
     total = models.DecimalField(max_digits=6, decimal_places=2)
     date = models.DateField(db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # The claim queue: open orders no one is delivering yet, oldest first (dispatch.py)
+            models.Index(fields=['id'], condition=models.Q(delivery_crew__isnull=True, status=False), name='order_unassigned_idx'),
+        ]
 
 
 class OrderItem(models.Model):
@@ -45,3 +74,32 @@ class OrderItem(models.Model):
 
     class Meta:
         unique_together = ('order', 'menuitem')
+
+
+class OrderEvent(models.Model):
+    """One row per order change, never updated; the id is the change feed's cursor."""
+    CREATED = 'created'
+    ASSIGNED = 'assigned'
+    DELIVERED = 'delivered'
+    KINDS = [(CREATED, 'Created'), (ASSIGNED, 'Assigned'), (DELIVERED, 'Delivered')]
+
+    id = models.BigAutoField(primary_key=True)
+    order = models.ForeignKey(Order, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=16, choices=KINDS)
+    # Copied from the order at the time, so the feed filters by role without a join
+    customer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', db_index=False)
+    delivery_crew = models.ForeignKey(User, on_delete=models.SET_NULL, related_name='+', null=True, db_index=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # A customer's or crew member's changes after a cursor
+            models.Index(fields=['customer', 'id'], name='orderevent_customer_idx'),
+            models.Index(fields=['delivery_crew', 'id'], name='orderevent_crew_idx'),
+        ]
+
+
+class TokenVersion(models.Model):
+    # Bumped to retire the role claims in every JWT issued to the user so far
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
+    version = models.PositiveIntegerField(default=0)
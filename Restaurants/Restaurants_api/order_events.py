@@ -0,0 +1,75 @@
+"""
+The order change log and its feed.
+
+Every order write that clients care about (placed, assigned to a crew
+member, delivered) appends an OrderEvent in the same transaction. Clients
+poll `api/orders/changes?since=<cursor>` and receive only the events after
+their cursor that their role may see, so a poll costs one index range scan
+sized by what changed, not by the order history. Events carry the customer
+and crew as they were at the time; a crew member whose order is reassigned
+stops seeing its later events.
+
+A cursor is only safe if no event can still commit below it, so event ids
+are handed out in commit order: SQLite has one writer at a time, and on
+PostgreSQL record() takes a transaction-scoped lock that its callers hold
+for the remaining moment until they commit (it is their last write).
+
+events_recorded is sent once the transaction that recorded events commits;
+live streams (order_stream.py) use it to pick them up at once.
+"""
+
+from django.db import connection, transaction
+from django.dispatch import Signal
+from rest_framework.fields import DateTimeField
+
+from .models import OrderEvent
+from .roles import MANAGER, DELIVERY_CREW, has_role
+
+
+FEED_LIMIT = 100
+FEED_FIELDS = ('id', 'order_id', 'kind', 'delivery_crew_id', 'created_at')
+RECORD_LOCK = 0x4f524456     # pg_advisory_xact_lock key serialising event inserts
+_datetime = DateTimeField()
+
+events_recorded = Signal()
+
+
+def record(kind, orders):
+    """
+    Appends a `kind` event for each (order id, customer id, crew id) in
+    `orders`, in one INSERT, and returns them. Call it last in the transaction.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [RECORD_LOCK])
+    events = OrderEvent.objects.bulk_create([
+        OrderEvent(kind=kind, order_id=order_id, customer_id=customer_id, delivery_crew_id=crew_id)
+        for order_id, customer_id, crew_id in orders
+    ])
+    transaction.on_commit(lambda: events_recorded.send(sender=OrderEvent))
+    return events
+
+
+def visible_events(user):
+    # The same split as the order list: managers see every order, crew their deliveries, customers their own
+    if has_role(user, MANAGER):
+        return OrderEvent.objects.all()
+    if has_role(user, DELIVERY_CREW):
+        return OrderEvent.objects.filter(delivery_crew=user)
+    return OrderEvent.objects.filter(customer=user)
+
+
+def changes_since(user, cursor, limit=FEED_LIMIT):
+    """Up to `limit` event rows after `cursor` visible to `user`, oldest first, and whether more follow."""
+    rows = list(visible_events(user).filter(id__gt=cursor).order_by('id').values(*FEED_FIELDS)[:limit + 1])
+    return rows[:limit], len(rows) > limit
+
+
+def event_data(row):
+    return {
+        'id': row['id'],
+        'order': row['order_id'],
+        'event': row['kind'],
+        'delivery_crew': row['delivery_crew_id'],
+        'at': _datetime.to_representation(row['created_at']),
+    }
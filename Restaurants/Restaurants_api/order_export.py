@@ -0,0 +1,75 @@
+from itertools import islice
+
+import django_filters
+
+from .menu_io import stream_records
+from .models import Order, OrderItem
+
+
+ORDER_FIELDS = ['id', 'user', 'delivery_crew', 'status', 'total', 'date']
+ITEM_FIELDS = ['menuitem', 'quantity', 'unit_price', 'total_price']
+CHUNK_SIZE = 2000
+
+
+"""  Filters  """
+class OrderExportFilter(django_filters.FilterSet):
+    date_from = django_filters.DateFilter(field_name='date', lookup_expr='gte')
+    date_to = django_filters.DateFilter(field_name='date', lookup_expr='lte')
+    status = django_filters.BooleanFilter(field_name='status')
+
+    class Meta:
+        model = Order
+        fields = ['date_from', 'date_to', 'status']
+
+
+"""  Export  """
+def _orders_with_items(queryset, chunk_size):
+    """
+    Yields (order row, [item rows]) in id order. Orders come off one
+    server-side cursor; their items are loaded with one query per chunk of
+    orders, so neither list ever holds more than `chunk_size` orders.
+    """
+    orders = (
+        queryset.order_by('id')
+        .values_list('id', 'user__username', 'delivery_crew_id', 'status', 'total', 'date')
+        .iterator(chunk_size=chunk_size)
+    )
+    while True:
+        chunk = list(islice(orders, chunk_size))
+        if not chunk:
+            return
+        items = {}
+        rows = (
+            OrderItem.objects.filter(order_id__in=[row[0] for row in chunk])
+            .order_by('id')
+            .values_list('order_id', 'menuitem__title', 'quantity', 'unit_price', 'total_price')
+        )
+        for order_id, *item in rows:
+            items.setdefault(order_id, []).append(item)
+        for row in chunk:
+            yield row, items.get(row[0], [])
+
+
+def export_orders(queryset, fmt, chunk_size=CHUNK_SIZE):
+    """
+    Streams `queryset` as NDJSON (one order per line with its items nested
+    under OrderSerializer's field names, though a menu item is its bare title
+    rather than the serializer's "title : $price") or CSV (one line per order
+    item, with the order columns repeated; orders without items get one line
+    of their own).
+    """
+    orders = _orders_with_items(queryset, chunk_size)
+    if fmt == 'csv':
+        empty = [''] * len(ITEM_FIELDS)
+        rows = (
+            (*order, *item)
+            for order, items in orders
+            for item in (items or [empty])
+        )
+        return stream_records(rows, ['order_id', *ORDER_FIELDS[1:], *ITEM_FIELDS], fmt)
+
+    rows = (
+        (*order, [dict(zip(ITEM_FIELDS, item)) for item in items])
+        for order, items in orders
+    )
+    return stream_records(rows, [*ORDER_FIELDS, 'orderitems'], fmt)
@@ -0,0 +1,281 @@
+"""
+Live order events for Server-Sent Event streams (api/async/orders/stream).
+
+Each ASGI worker runs one poller per event loop, started by the first
+subscriber and stopped with the last. It tails the OrderEvent log by id and
+hands every new event to the streams allowed to see it, looked up by key
+(everyone's for managers, per crew member, per customer), so an event costs
+work only for its recipients and an idle stream costs a queue and nothing
+else: no database connection, thread or polling of its own (see asgi.py).
+The poller wakes immediately when this process commits events (see
+signals.py) and polls every ORDER_STREAM_POLL_INTERVAL seconds for the ones
+other workers write.
+
+Ids the poller skips over (usually rolled back inserts) are re-checked for
+GAP_TIMEOUT seconds, in case a slow transaction still commits them.
+A stream that falls QUEUE_SIZE events behind catches up from the database,
+as does a client reconnecting with Last-Event-ID.
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, connections
+from django.db.models import Max, Q
+
+from . import order_events
+from .models import OrderEvent
+from .roles import MANAGER, DELIVERY_CREW, areload_roles
+
+
+logger = logging.getLogger(__name__)
+
+
+BATCH = 500
+GAP_TIMEOUT = 10
+MAX_GAPS = 1000
+QUEUE_SIZE = 256
+RETRY_MS = 3000
+FIELDS = order_events.FEED_FIELDS + ('customer_id',)
+EVERYONE = ('everyone',)
+
+
+def subscription_key(user, roles):
+    # The same split as order_events.visible_events()
+    if MANAGER in roles:
+        return EVERYONE
+    if DELIVERY_CREW in roles:
+        return ('crew', user.pk)
+    return ('customer', user.pk)
+
+
+"""  Subscriptions  """
+class Subscription:
+    def __init__(self, key):
+        self.key = key
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+        self.overflowed = False
+
+    def put(self, row):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    def reset(self):
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+        self.overflowed = False
+
+
+class Broker:
+    """The subscriptions of one event loop and the poller feeding them."""
+
+    def __init__(self):
+        self.subscribers = {}
+        self.count = 0
+        self.cursor = None
+        self.gaps = {}          # {skipped id: when to stop looking for it}
+        self.ready = asyncio.Event()
+        self.wakeup = asyncio.Event()
+        self.task = None
+
+    def subscribe(self, key):
+        subscription = Subscription(key)
+        self.subscribers.setdefault(key, set()).add(subscription)
+        self.count += 1
+        if self.task is None:
+            self.task = asyncio.get_running_loop().create_task(self.run(), context=contextvars.Context())
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscriptions = self.subscribers.get(subscription.key)
+        if subscriptions is None or subscription not in subscriptions:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self.subscribers[subscription.key]
+        self.count -= 1
+        if not self.count:
+            self.wakeup.set()
+
+    def horizon(self):
+        """The lowest id the poller may still publish."""
+        return min(self.gaps, default=self.cursor + 1)
+
+    def publish(self, rows):
+        for row in rows:
+            for key in (EVERYONE, ('customer', row['customer_id']), ('crew', row['delivery_crew_id'])):
+                for subscription in self.subscribers.get(key, ()):
+                    subscription.put(row)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        # One thread, so the poller holds one database connection per worker
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='order-stream')
+        try:
+            while self.count:
+                self.wakeup.clear()
+                try:
+                    rows = await loop.run_in_executor(executor, self.fetch, self.cursor, list(self.gaps))
+                except DatabaseError:
+                    logger.exception('Polling order events failed')
+                    rows = []
+                else:
+                    if self.cursor is None:
+                        self.cursor = rows      # the latest id, on the first poll
+                        self.ready.set()
+                        continue
+                    self.advance(rows)
+                    self.publish(rows)
+                    if len(rows) == BATCH:
+                        continue
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), settings.ORDER_STREAM_POLL_INTERVAL)
+                except TimeoutError:
+                    pass
+        finally:
+            self.task, self.cursor, self.gaps = None, None, {}
+            self.ready.clear()
+            executor.submit(connections.close_all)
+            executor.shutdown(wait=False)
+
+    @staticmethod
+    def fetch(cursor, gaps):
+        """Runs on the poller's thread: the latest id on the first call, then the events after `cursor` or in `gaps`."""
+        close_old_connections()
+        if cursor is None:
+            return OrderEvent.objects.aggregate(last=Max('id'))['last'] or 0
+        condition = Q(id__gt=cursor)
+        if gaps:
+            condition |= Q(id__in=gaps)
+        return list(OrderEvent.objects.filter(condition).order_by('id').values(*FIELDS)[:BATCH])
+
+    def advance(self, rows):
+        now = time.monotonic()
+        for row in rows:
+            pk = row['id']
+            self.gaps.pop(pk, None)
+            if pk > self.cursor:
+                skipped = range(max(self.cursor + 1, pk - MAX_GAPS), pk)
+                self.gaps.update(dict.fromkeys(skipped, now + GAP_TIMEOUT))
+                self.cursor = pk
+        self.gaps = {pk: until for pk, until in self.gaps.items() if until > now}
+
+
+_brokers = weakref.WeakKeyDictionary()
+
+
+def get_broker():
+    loop = asyncio.get_running_loop()
+    broker = _brokers.get(loop)
+    if broker is None:
+        broker = _brokers[loop] = Broker()
+    return broker
+
+
+def wake():
+    """Makes every running poller in this process poll now; safe from any thread."""
+    for loop, broker in list(_brokers.items()):
+        if broker.task is not None:
+            try:
+                loop.call_soon_threadsafe(broker.wakeup.set)
+            except RuntimeError:    # the loop has closed
+                pass
+
+
+"""  Streams  """
+def _release_connection():
+    # An idle stream holds no database connection of its own
+    if not connection.in_atomic_block:
+        connection.close()
+
+
+def _message(row, cursor):
+    data = json.dumps(order_events.event_data(row), separators=(',', ':'))
+    return f'id: {cursor}\nevent: {row["kind"]}\ndata: {data}\n\n'.encode()
+
+
+async def stream_events(user, roles, since=None, timeout=None):
+    """
+    The Server-Sent Events body for `user`: the events after `since`, if
+    given, then live events until `timeout` seconds (at most
+    ORDER_STREAM_MAX_AGE) have passed. With timeout=0 only the backlog is sent.
+    The user's roles are re-read every ORDER_STREAM_KEEPALIVE seconds, and the
+    stream ends once they call for another audience: the client reconnects.
+    Each event's SSE id is the highest event id sent so far, so a client
+    reconnecting with Last-Event-ID resumes where it left off.
+    """
+    max_age = settings.ORDER_STREAM_MAX_AGE
+    timeout = max_age if timeout is None else min(timeout, max_age)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    recheck = loop.time() + settings.ORDER_STREAM_KEEPALIVE
+    broker = get_broker() if timeout else None
+    subscription = broker.subscribe(subscription_key(user, roles)) if broker else None
+    try:
+        cursor, floor, seen, horizon = since, since, set(), None
+        if broker:
+            await broker.ready.wait()
+            # Every event published from now on has an id from the horizon up
+            horizon = broker.horizon()
+            if since is None:
+                cursor = broker.cursor
+        # The first message: from here on nothing is missed
+        yield f'retry: {RETRY_MS}\n\n'.encode()
+
+        catch_up = since is not None
+        if not catch_up:
+            await sync_to_async(_release_connection)()
+        while True:
+            if subscription and subscription.overflowed:
+                subscription.reset()
+                floor, horizon = cursor, broker.horizon()
+                catch_up = True
+            if catch_up:
+                # Replayed events may be published too; remember which, to skip them
+                more = True
+                while more:
+                    rows, more = await sync_to_async(order_events.changes_since)(user, cursor)
+                    for row in rows:
+                        cursor = max(cursor, row['id'])
+                        if horizon is not None and row['id'] >= horizon:
+                            seen.add(row['id'])
+                        yield _message(row, cursor)
+                await sync_to_async(_release_connection)()
+                catch_up = False
+            if not broker:
+                return
+
+            now = loop.time()
+            remaining = deadline - now
+            if remaining <= 0:
+                return
+            if now >= recheck:
+                if subscription_key(user, await areload_roles(user)) != subscription.key:
+                    return
+                await sync_to_async(_release_connection)()
+                recheck = now + settings.ORDER_STREAM_KEEPALIVE
+            try:
+                row = await asyncio.wait_for(subscription.queue.get(), min(settings.ORDER_STREAM_KEEPALIVE, remaining))
+            except TimeoutError:
+                yield b': keepalive\n\n'
+                continue
+            if row['id'] in seen:
+                seen.discard(row['id'])
+                continue
+            if floor is not None and row['id'] <= floor:
+                continue
+            cursor = row['id'] if cursor is None else max(cursor, row['id'])
+            yield _message(row, cursor)
+    finally:
+        if subscription:
+            broker.unsubscribe(subscription)
@@ -0,0 +1,189 @@
+import json
+import math
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from functools import reduce
+from operator import and_, or_
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+"""  Keyset (cursor) pagination  """
+class KeysetPagination(BasePagination):
+    """
+    Seeks on the ordering columns instead of counting and offsetting, so every
+    page costs the same however deep the client is. The ordering comes from the
+    view's OrderingFilter when one is used and always ends with the primary key.
+    Ordering fields must be non-null model columns.
+    """
+    page_size = 10
+    page_size_query_param = 'perpage'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering = ('id',)
+    invalid_cursor_message = 'Invalid cursor'
+
+    @classmethod
+    def is_requested(cls, request):
+        params = request.query_params
+        return params.get('pagination') == 'cursor' or cls.cursor_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+        values, reverse = self.decode_cursor(request)
+        if values is not None:
+            values = self.clean_values(queryset, values)
+
+        ordering = [self.flip(field) for field in self.ordering] if reverse else list(self.ordering)
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self.seek(ordering, values))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.page = results
+        self.has_next = has_more if not reverse else values is not None
+        self.has_previous = values is not None if not reverse else has_more
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(request.query_params[self.page_size_query_param], strict=True, cutoff=self.max_page_size)
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_ordering(self, request, queryset, view):
+        ordering = None
+        for backend in getattr(view, 'filter_backends', []):
+            if hasattr(backend, 'get_ordering'):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        ordering = list(ordering or self.ordering)
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        return ordering
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, instance, reverse):
+        # Pages hold model instances, or dicts when a view lists .values() rows
+        names = [field.lstrip('-') for field in self.ordering]
+        if isinstance(instance, dict):
+            values = [instance[name] for name in names]
+        else:
+            values = [getattr(instance, name) for name in names]
+        payload = json.dumps({'v': values, 'r': reverse}, cls=DjangoJSONEncoder)
+        cursor = urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded.encode()))
+            values, reverse = payload['v'], bool(payload['r'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def clean_values(self, queryset, values):
+        """The cursor's values as their ordering fields' Python types; the cursor is client input."""
+        cleaned = []
+        for field_name, value in zip(self.ordering, values):
+            field = self.ordering_field(queryset, field_name.lstrip('-'))
+            try:
+                value = field.to_python(value)
+                if value is None:
+                    if not field.null:
+                        raise ValidationError('null')
+                elif isinstance(value, float) and not math.isfinite(value):
+                    raise ValidationError('not finite')
+                else:
+                    field.run_validators(value)
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+            cleaned.append(value)
+        return cleaned
+
+    @staticmethod
+    def ordering_field(queryset, name):
+        # A model column, or an annotation such as the search rank
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        if name == 'pk':
+            return queryset.model._meta.pk
+        return queryset.model._meta.get_field(name)
+
+    @staticmethod
+    def flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def seek(ordering, values):
+        # (a, b) > (x, y)  ==  a > x OR (a = x AND b > y), honouring each direction
+        clauses = []
+        for i, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal = [Q(**{ordering[j].lstrip('-'): values[j]}) for j in range(i)]
+            clauses.append(reduce(and_, equal + [Q(**{f'{name}__{lookup}': values[i]})]))
+        return reduce(or_, clauses)
+
+
+class CursorPaginationMixin:
+    """
+    Lets clients opt in to keyset pagination with ?pagination=cursor while the
+    view keeps its regular pagination_class otherwise.
+    """
+    cursor_pagination_class = KeysetPagination
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if self.request is not None and self.cursor_pagination_class.is_requested(self.request):
+                self._paginator = self.cursor_pagination_class()
+            else:
+                self._paginator = None if self.pagination_class is None else self.pagination_class()
+        return self._paginator
@@ -0,0 +1,18 @@
+import msgpack
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+"""  MessagePack  """
+class MessagePackParser(BaseParser):
+    """
+    Parses application/msgpack request bodies. Prices may be sent as strings
+    or numbers, as with JSON; the serializers validate them the same way.
+    """
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False, timestamp=0)
+        except (ValueError, TypeError, msgpack.UnpackException) as exc:
+            raise ParseError(f'MessagePack parse error - {exc}')
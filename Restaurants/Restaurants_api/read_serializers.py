@@ -0,0 +1,145 @@
+"""
+Read-only serializers built on .values() rows.
+
+Each class mirrors the output of its ModelSerializer in serializers.py for
+list/detail reads, skipping model instantiation and DRF's per-field
+machinery. The dicts they build render to exactly the same bytes; keep the
+two in step when a serializer's fields change.
+"""
+
+from decimal import Decimal
+
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .models import OrderItem
+
+
+CENTS = Decimal('0.01')
+
+
+def decimal_value(value):
+    # DecimalField(decimal_places=2).to_representation()
+    if value is None:
+        return None
+    value = value.quantize(CENTS)
+    return '{:f}'.format(value) if api_settings.COERCE_DECIMAL_TO_STRING else value
+
+
+def date_value(value):
+    # DateField.to_representation() with the default ISO 8601 format
+    return value.isoformat() if value is not None else None
+
+
+class ReadSerializer:
+    fields = ()
+
+    def __init__(self, instance=None, many=False):
+        self.instance = instance
+        self.many = many
+
+    @classmethod
+    def values(cls, queryset):
+        # Annotations (a search rank) come along for keyset cursors to seek on
+        return queryset.values(*cls.fields, *queryset.query.annotation_select)
+
+    def to_representation(self, row):
+        raise NotImplementedError
+
+    @property
+    def data(self):
+        if self.many:
+            return [self.to_representation(row) for row in self.instance]
+        return self.to_representation(self.instance)
+
+
+"""  Category & Menu Item  """
+class CategoryReadSerializer(ReadSerializer):
+    fields = ('id', 'slug', 'title')
+
+    def to_representation(self, row):
+        return {'id': row['id'], 'slug': row['slug'], 'title': row['title']}
+
+
+class MenuItemReadSerializer(ReadSerializer):
+    fields = ('id', 'title', 'price', 'featured', 'category')
+
+    def to_representation(self, row):
+        return {
+            'id': row['id'],
+            'title': row['title'],
+            'price': decimal_value(row['price']),
+            'featured': row['featured'],
+            'category': row['category'],
+        }
+
+
+"""  Cart  """
+class CartReadSerializer(ReadSerializer):
+    fields = ('id', 'menuitem', 'quantity', 'unit_price')
+
+    def to_representation(self, row):
+        return {
+            'id': row['id'],
+            'menuitem': row['menuitem'],
+            'quantity': row['quantity'],
+            'price': row['unit_price'] * row['quantity'],   # SerializerMethodField: left as a Decimal
+        }
+
+
+"""  Order  """
+class OrderReadSerializer(ReadSerializer):
+    fields = ('id', 'user__username', 'delivery_crew', 'status', 'total', 'date')
+
+    @property
+    def data(self):
+        rows = list(self.instance) if self.many else [self.instance]
+        items = self.load_items([row['id'] for row in rows])
+        data = [self.to_representation(row, items.get(row['id'], [])) for row in rows]
+        return data if self.many else data[0]
+
+    @staticmethod
+    def load_items(order_ids):
+        # One query for the items of every order on the page
+        items = {}
+        rows = (
+            OrderItem.objects.filter(order_id__in=order_ids)
+            .order_by('id')
+            .values_list('order_id', 'menuitem__title', 'menuitem__price', 'quantity', 'unit_price', 'total_price')
+        )
+        for order_id, title, price, quantity, unit_price, total_price in rows:
+            items.setdefault(order_id, []).append({
+                'menuitem': f'{title} : ${price}',      # MenuItem.__str__
+                'quantity': quantity,
+                'unit_price': decimal_value(unit_price),
+                'total_price': decimal_value(total_price),
+            })
+        return items
+
+    def to_representation(self, row, items):
+        return {
+            'id': row['id'],
+            'user': row['user__username'],
+            'delivery_crew': row['delivery_crew'],
+            'status': row['status'],
+            'total': decimal_value(row['total']),
+            'date': date_value(row['date']),
+            'orderitems': items,
+        }
+
+
+"""  Views  """
+class ReadSerializerMixin:
+    """
+    list() through `read_serializer_class` instead of the view's
+    ModelSerializer. Filtering and pagination apply to the .values()
+    queryset exactly as they would to model instances.
+    """
+    read_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.read_serializer_class.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.read_serializer_class(page, many=True).data)
+        return Response(self.read_serializer_class(queryset, many=True).data)
@@ -0,0 +1,65 @@
+from decimal import Decimal
+
+import msgpack
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:     # optional: falls back to the stdlib path of JSONRenderer
+    orjson = None
+
+
+"""  Fast JSON  """
+class FastJSONRenderer(JSONRenderer):
+    """
+    Drop-in JSONRenderer rendering through orjson when it is installed.
+    Dates and datetimes are encoded natively, Decimals become floats as with
+    DRF's encoder, and the output is byte for byte what JSONRenderer would
+    produce. Indented output, non-UTF-8/non-compact settings and anything
+    orjson refuses (e.g. integers beyond 64 bits) go through JSONRenderer.
+    """
+    encoder = encoders.JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or data is None or self.ensure_ascii or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder.default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same strict-javascript-subset escaping as JSONRenderer
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+        return ret
+
+
+"""  MessagePack  """
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renders application/msgpack. Decimals are sent as their exact decimal
+    string (e.g. "12.50"), as serializers already send DecimalFields, and
+    dates/datetimes/times as the same ISO 8601 strings the JSON renderer
+    writes. Anything else msgpack can't pack goes through DRF's JSON encoder.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+    encoder = encoders.JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=self.default, use_bin_type=True, datetime=False)
+
+    @classmethod
+    def default(cls, obj):
+        if isinstance(obj, Decimal):
+            return str(obj)
+        return cls.encoder.default(obj)
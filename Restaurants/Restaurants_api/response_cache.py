@@ -0,0 +1,108 @@
+import threading
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.core.cache import caches
+from django.db import connection, transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+from .menu_filters import MenuItemFilter
+
+
+CACHE_ALIAS = 'catalogue'
+VERSION_KEY = 'catalogue:version'
+# The query parameters the cached views read. Any other is left out of the key,
+# so made-up ones cannot flood the cache with copies of the same page.
+KEY_PARAMS = frozenset(MenuItemFilter.Meta.fields) | {'ordering', 'page', 'perpage', 'cursor', 'pagination', 'search'}
+
+
+"""  Hit/miss counters (per process)  """
+class CacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+    def reset(self):
+        with self._lock:
+            self.hits = self.misses = 0
+
+
+stats = CacheStats()
+
+
+"""  Catalogue version  """
+# The time of the last catalogue write (or of seeding) in ns, so it doubles as the catalogue's Last-Modified
+def get_version():
+    cache = caches[CACHE_ALIAS]
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Seeded from the clock so a culled version key never resurrects old entries
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    """Retires cached catalogue responses now and, inside a transaction, again once it commits."""
+    # Until the commit, another request can read the old rows and cache them under the new version
+    _next_version()
+    if connection.in_atomic_block:
+        transaction.on_commit(_next_version)
+
+
+def _next_version():
+    cache = caches[CACHE_ALIAS]
+    cache.set(VERSION_KEY, max(time.time_ns(), (cache.get(VERSION_KEY) or 0) + 1), None)
+
+
+"""  Response caching for public catalogue reads  """
+def cache_key(request, view_name):
+    params = sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values
+        if key in KEY_PARAMS and value != ''
+    )
+    query = urlencode(params)     # spaces in ?search= would be invalid key characters
+    return f'catalogue:{get_version()}:{view_name}:{request.build_absolute_uri(request.path)}?{query}'
+
+
+def cache_catalogue_response(method):
+    """
+    Caches the response data of a GET handler under the current catalogue
+    version, so any MenuItem/Category write makes earlier entries unreachable.
+    Data is stored before rendering and content negotiation still runs per
+    request.
+    """
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        cache = caches[CACHE_ALIAS]
+        key = cache_key(request, type(self).__name__)
+        data = cache.get(key)
+        if data is not None:
+            stats.record(hit=True)
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        stats.record(hit=False)
+        response = method(self, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data)
+        response['X-Cache'] = 'MISS'
+        return response
+    return wrapper
@@ -0,0 +1,132 @@
+from django.db.models import F
+
+from .auth_cache import auth_cache, invalidate
+from .models import TokenVersion
+
+
+MANAGER = 'Manager'
+DELIVERY_CREW = 'DeliveryCrew'
+# Only in JWT role claims and request_roles(): never group names
+STAFF = 'staff'
+CUSTOMER = 'customer'
+
+ROLES_CLAIM = 'roles'
+VERSION_CLAIM = 'ver'
+
+_REQUEST_ATTR = '_cached_roles'
+
+
+"""  Role resolution  """
+def _cache_key(user_id):
+    return f'roles:{user_id}'
+
+
+def get_roles(user):
+    """
+    Group names of `user`, loaded at most once per request and shared across
+    requests through the 'auth' cache until membership changes.
+    """
+    if user is None or not user.is_authenticated:
+        return frozenset()
+
+    roles = getattr(user, _REQUEST_ATTR, None)
+    if roles is not None:
+        return roles
+
+    key = _cache_key(user.pk)
+    cached = auth_cache().get(key)
+    if cached is None:
+        cached = list(user.groups.values_list('name', flat=True))
+        auth_cache().set(key, cached)
+
+    roles = frozenset(cached)
+    setattr(user, _REQUEST_ATTR, roles)
+    return roles
+
+
+async def aget_roles(user):
+    """Async-safe counterpart of get_roles() sharing the same caches."""
+    if user is None or not user.is_authenticated:
+        return frozenset()
+
+    roles = getattr(user, _REQUEST_ATTR, None)
+    if roles is not None:
+        return roles
+
+    key = _cache_key(user.pk)
+    cached = await auth_cache().aget(key)
+    if cached is None:
+        cached = [name async for name in user.groups.values_list('name', flat=True)]
+        await auth_cache().aset(key, cached)
+
+    roles = frozenset(cached)
+    setattr(user, _REQUEST_ATTR, roles)
+    return roles
+
+
+async def areload_roles(user):
+    """aget_roles() past the request's memo, for requests that outlive a membership change."""
+    user.__dict__.pop(_REQUEST_ATTR, None)
+    return await aget_roles(user)
+
+
+def has_role(user, name):
+    return name in get_roles(user)
+
+
+def invalidate_roles(*user_ids):
+    invalidate([_cache_key(user_id) for user_id in user_ids])
+
+
+"""  Role claims in JWTs  """
+def _version_key(user_id):
+    return f'token_version:{user_id}'
+
+
+def token_version(user_id):
+    # Read through the 'auth' cache, so a bump retires claims on every worker (see auth_cache.py)
+    key = _version_key(user_id)
+    version = auth_cache().get(key)
+    if version is None:
+        version = TokenVersion.objects.filter(user_id=user_id).values_list('version', flat=True).first() or 0
+        auth_cache().set(key, version)
+    return version
+
+
+def bump_token_versions(*user_ids):
+    """Retires the role claims of every JWT issued so far to these users."""
+    if not user_ids:
+        return
+    TokenVersion.objects.filter(user_id__in=user_ids).update(version=F('version') + 1)
+    TokenVersion.objects.bulk_create([TokenVersion(user_id=user_id, version=1) for user_id in user_ids], ignore_conflicts=True)
+    invalidate([_version_key(user_id) for user_id in user_ids])
+
+
+def role_claims(user):
+    roles = sorted(get_roles(user)) or [CUSTOMER]
+    if user.is_staff:
+        roles.append(STAFF)
+    return {ROLES_CLAIM: roles, VERSION_CLAIM: token_version(user.pk)}
+
+
+def use_role_claims(user, claims):
+    """
+    Serves get_roles(user) for this request from the verified claims of its
+    token, so handlers checking roles make no queries either.
+    """
+    setattr(user, _REQUEST_ATTR, frozenset(claims[ROLES_CLAIM]) - {STAFF, CUSTOMER})
+
+
+def request_roles(request):
+    """
+    Roles for permission checks: the signed claims of a JWT when it carries
+    them, otherwise the user's groups, plus STAFF for staff users and CUSTOMER
+    for anyone in no group.
+    """
+    claims = getattr(request.auth, 'payload', None)
+    if claims and ROLES_CLAIM in claims:
+        return frozenset(claims[ROLES_CLAIM])
+    roles = set(get_roles(request.user)) or {CUSTOMER}
+    if request.user and request.user.is_staff:
+        roles.add(STAFF)
+    return frozenset(roles)
@@ -0,0 +1,194 @@
+"""
+Ranked, typo-tolerant search over menu item titles (?search=).
+
+On PostgreSQL with the pg_trgm extension the database does the work: a
+full-text match on the stemmed title (every word as a prefix, for type-ahead)
+or a trigram word-similarity match catches typos, both served by the GIN
+indexes of migration 0005, and the rank adds the two scores. Elsewhere (SQLite,
+or PostgreSQL without pg_trgm) an in-process inverted index over title words
+finds the matches and their scores; it is rebuilt, once per process, after any
+catalogue write bumps the catalogue version.
+
+Either way the matches come back as a queryset annotated with `rank`, so the
+view's filters, ordering and pagination apply unchanged; results are ordered
+by rank unless the client asks for another ordering.
+"""
+
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.db import connections
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.functions import Cast
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+from .models import MenuItem
+from .response_cache import get_version
+
+
+SEARCH_CONFIG = 'english'
+# Share of a word's trigrams a title word needs in common with it to count as a typo of it
+FUZZY_THRESHOLD = 0.3
+# The in-process index ranks at most this many matches
+MAX_MATCHES = 1000
+
+
+def search_words(text):
+    return re.findall(r'\w+', text.lower())
+
+
+def search_menu_items(queryset, text):
+    """`queryset` narrowed to the items matching `text`, annotated with `rank`."""
+    if uses_database_search(queryset.db):
+        return database_search(queryset, text)
+    return memory_search(queryset, text)
+
+
+"""  PostgreSQL  """
+_trigram_support = {}
+
+
+def uses_database_search(alias):
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return False
+    if alias not in _trigram_support:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            _trigram_support[alias] = cursor.fetchone() is not None
+    return _trigram_support[alias]
+
+
+def database_search(queryset, text):
+    from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+
+    words = search_words(text)
+    phrase = ' '.join(words)
+    # Matches the expression of the GIN index in migration 0005
+    document = SearchVector('title', config=SEARCH_CONFIG)
+    query = SearchQuery(' & '.join(f'{word}:*' for word in words), search_type='raw', config=SEARCH_CONFIG)
+    return (
+        queryset.alias(document=document)
+        .filter(Q(document=query) | Q(title__trigram_word_similar=phrase))
+        # Cast: a double round-trips through keyset cursors exactly, ts_rank's real doesn't
+        .annotate(rank=Cast(SearchRank(F('document'), query) + TrigramWordSimilarity(phrase, 'title'), FloatField()))
+    )
+
+
+"""  In-process index  """
+def trigrams(word):
+    # Padded like pg_trgm's, so short words and word starts weigh in
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class MenuSearchIndex:
+    """Title words to item ids, with a sorted vocabulary for prefixes and trigrams for typos."""
+
+    def __init__(self, rows):
+        self.postings = defaultdict(set)
+        for item_id, title in rows:
+            for word in search_words(title):
+                self.postings[word].add(item_id)
+        self.vocabulary = sorted(self.postings)
+        self.grams = defaultdict(set)
+        for word in self.vocabulary:
+            for gram in trigrams(word):
+                self.grams[gram].add(word)
+
+    def word_matches(self, word):
+        """Vocabulary words matching `word` with their weight: 1 exact, under 1 for a prefix or typo."""
+        matches = {}
+        for term in self.vocabulary[bisect_left(self.vocabulary, word):]:
+            if not term.startswith(word):
+                break
+            matches[term] = 1.0 if term == word else 0.5 + 0.5 * len(word) / len(term)
+
+        grams = trigrams(word)
+        shared = defaultdict(int)
+        for gram in grams:
+            for term in self.grams.get(gram, ()):
+                shared[term] += 1
+        for term, count in shared.items():
+            similarity = count / (len(grams) + len(trigrams(term)) - count)
+            if similarity >= FUZZY_THRESHOLD and similarity * 0.9 > matches.get(term, 0):
+                matches[term] = similarity * 0.9
+        return matches
+
+    def search(self, text):
+        """{item id: score} for the items matching every word of `text`."""
+        scores = None
+        for word in search_words(text):
+            best = {}
+            for term, weight in self.word_matches(word).items():
+                for item_id in self.postings[term]:
+                    if weight > best.get(item_id, 0):
+                        best[item_id] = weight
+            if scores is None:
+                scores = best
+            else:
+                scores = {item_id: score + best[item_id] for item_id, score in scores.items() if item_id in best}
+            if not scores:
+                break
+        return scores or {}
+
+
+_index = None
+_index_version = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    global _index, _index_version
+    version = get_version()
+    if _index_version != version:
+        with _index_lock:
+            if _index_version != version:
+                _index = MenuSearchIndex(MenuItem.objects.values_list('id', 'title').iterator(chunk_size=10_000))
+                _index_version = version
+    return _index
+
+
+def reset_index():
+    global _index, _index_version
+    _index = _index_version = None
+
+
+def memory_search(queryset, text):
+    scores = get_index().search(text)
+    best = sorted(scores.items(), key=lambda pair: (-pair[1], pair[0]))[:MAX_MATCHES]
+    if not best:
+        return queryset.none().annotate(rank=Value(0.0, output_field=FloatField()))
+    # One WHEN per distinct score: far fewer than matches, as word weights repeat
+    by_score = defaultdict(list)
+    for item_id, score in best:
+        by_score[score].append(item_id)
+    return queryset.filter(id__in=[item_id for item_id, _ in best]).annotate(
+        rank=Case(*(When(id__in=ids, then=Value(score)) for score, ids in by_score.items()), output_field=FloatField())
+    )
+
+
+"""  Filter backends  """
+class MenuItemSearchFilter(BaseFilterBackend):
+    search_param = 'search'
+
+    @classmethod
+    def get_search_text(cls, params):
+        text = params.get(cls.search_param, '')
+        return text if search_words(text) else None
+
+    def filter_queryset(self, request, queryset, view):
+        text = self.get_search_text(request.query_params)
+        return queryset if text is None else search_menu_items(queryset, text)
+
+
+class RankOrderingFilter(OrderingFilter):
+    """OrderingFilter that defaults to best match first while searching."""
+    search_ordering = ('-rank', 'id')
+
+    def get_default_ordering(self, view):
+        if MenuItemSearchFilter.get_search_text(view.request.query_params) is not None:
+            return list(self.search_ordering)
+        return super().get_default_ordering(view)
@@ -4,13 +4,14 @@ from decimal import Decimal
 # from rest_framework.validators import UniqueTogetherValidator
 from django.contrib.auth.models import User, Group
 import bleach
+from .dispatch import MAX_ASSIGN_BATCH
 
 
 """  Category  """
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
-        fields = '__all__'
+        fields = ['id', 'slug', 'title']
 
 
 """  Menu Item and Category  """
@@ -61,8 +62,46 @@ class CartSerializer(serializers.ModelSerializer):
         instance.price = instance.unit_price * instance.quantity
         instance.save()
         return instance
+
+
+
+class CartLineSerializer(serializers.Serializer):
+    menuitem = serializers.IntegerField()
+    quantity = serializers.IntegerField()
+
+    def validate_quantity(self, value):
+        if value < 0:
+            raise serializers.ValidationError("quantity less than 0")
+        return value
         
 
+"""  Bulk order assignment  """
+class OrderAssignmentSerializer(serializers.Serializer):
+    order = serializers.IntegerField()
+    username = serializers.CharField()
+
+
+class BulkAssignSerializer(serializers.Serializer):
+    """Either explicit `assignments`, or `orders` to spread over the crew (all of it, or `usernames`)."""
+    assignments = OrderAssignmentSerializer(many=True, required=False)
+    orders = serializers.ListField(child=serializers.IntegerField(), required=False)
+    usernames = serializers.ListField(child=serializers.CharField(), required=False)
+
+    def validate(self, data):
+        if ('assignments' in data) == ('orders' in data):
+            raise serializers.ValidationError("Provide either assignments or orders")
+        if 'assignments' in data and 'usernames' in data:
+            raise serializers.ValidationError("usernames only applies to balancing orders")
+        order_ids = [entry['order'] for entry in data['assignments']] if 'assignments' in data else data['orders']
+        if not order_ids:
+            raise serializers.ValidationError("No orders to assign")
+        if len(order_ids) > MAX_ASSIGN_BATCH:
+            raise serializers.ValidationError(f"At most {MAX_ASSIGN_BATCH} orders per request")
+        if len(set(order_ids)) != len(order_ids):
+            raise serializers.ValidationError("Each order may appear only once")
+        return data
+
+
 """  Order Item  """
 class OrderItemSerializer(serializers.ModelSerializer):
     menuitem = serializers.StringRelatedField()
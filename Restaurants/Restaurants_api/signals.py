@@ -0,0 +1,81 @@
+from django.contrib.auth.models import Group, User
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from .authentication import invalidate_token, invalidate_user
+from .blacklist import token_blacklisted
+from .models import MenuItem, Category
+from .order_events import events_recorded
+from .order_stream import wake as wake_order_streams
+from .response_cache import bump_version
+from .roles import invalidate_roles, bump_token_versions
+
+
+"""  Drop cached roles whenever group membership changes  """
+# Any change also retires the role claims in the user's JWTs. Gaining a role
+# counts too: a user in no group is a customer, and stale claims would keep them one.
+@receiver(m2m_changed, sender=User.groups.through)
+def group_membership_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate_roles(instance.pk)
+            bump_token_versions(instance.pk)
+    elif action == 'pre_clear':
+        members = list(instance.user_set.values_list('id', flat=True))
+        invalidate_roles(*members)
+        bump_token_versions(*members)
+    elif action in ('post_add', 'post_remove') and pk_set:
+        invalidate_roles(*pk_set)
+        bump_token_versions(*pk_set)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    if instance.pk:
+        members = list(instance.user_set.values_list('id', flat=True))
+        invalidate_roles(*members)
+        bump_token_versions(*members)
+
+
+@receiver(pre_save, sender=User)
+def staff_status_changing(sender, instance, update_fields=None, **kwargs):
+    if instance.pk and not instance.is_staff and (update_fields is None or 'is_staff' in update_fields):
+        if User.objects.filter(pk=instance.pk, is_staff=True).exists():
+            bump_token_versions(instance.pk)
+
+
+"""  Drop cached authentication lookups for deleted tokens and changed users  """
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+"""  Blacklisted JWTs join this process's blacklist filter at once  """
+@receiver(post_save, sender=BlacklistedToken)
+def jwt_blacklisted(sender, instance, created, **kwargs):
+    if created:
+        token_blacklisted(instance.token.jti)
+
+
+"""  Any catalogue write retires cached catalogue responses  """
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def catalogue_changed(sender, **kwargs):
+    bump_version()
+
+
+"""  Committed order events reach this process's live streams at once  """
+@receiver(events_recorded)
+def order_events_recorded(sender, **kwargs):
+    wake_order_streams()
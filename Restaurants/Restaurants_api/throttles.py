@@ -0,0 +1,142 @@
+"""
+GCRA (generic cell rate algorithm) throttling.
+
+A rate of N requests per period is a bucket of N tokens refilled at one token
+every period / N. GCRA tracks it with a single number per client, the
+theoretical arrival time (TAT) of the client's next request, so a check is one
+atomic read-modify-write of one integer key: a Lua script on Redis, or a
+process lock on the local-memory cache, whose data never leaves the process
+anyway. DRF's SimpleRateThrottle instead rewrites the list of every request
+timestamp in the window, which is O(N) per request and races across workers.
+"""
+
+import math
+import threading
+import time
+
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+
+MICROSECOND = 1_000_000
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+# Scopes for views that mix public catalogue reads with manager writes
+MENU_READS = {'GET': 'menu', 'HEAD': 'menu'}
+
+
+def parse_rate(rate):
+    """'120/minute' -> (120, 60), read the way DRF reads DEFAULT_THROTTLE_RATES."""
+    num, period = rate.split('/')
+    return int(num), PERIODS[period[0]]
+
+
+"""  Atomic cache operations  """
+# TAT, interval and period are integer microseconds: Django's Redis cache
+# stores ints unpickled, so the script and cache.get() read the same value.
+GCRA_SCRIPT = """
+local now, interval, period = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local tat = math.max(tonumber(redis.call('GET', KEYS[1])) or 0, now)
+local new_tat = tat + interval
+if new_tat - now > period then
+    return new_tat - period - now
+end
+redis.call('SET', KEYS[1], string.format('%d', new_tat), 'PX', math.ceil((new_tat - now) / 1000))
+return 0
+"""
+
+_script = None
+_local_lock = threading.Lock()
+
+
+def _redis_update(cache, key, now, interval, period):
+    global _script
+    key = cache.make_and_validate_key(key)
+    client = cache._cache.get_client(key, write=True)
+    if _script is None:
+        _script = client.register_script(GCRA_SCRIPT)    # EVALSHA, loading the script on first use
+    return int(_script(keys=[key], args=[now, interval, period], client=client))
+
+
+def _local_update(cache, key, now, interval, period):
+    with _local_lock:
+        tat = max(cache.get(key) or 0, now)
+        new_tat = tat + interval
+        if new_tat - now > period:
+            return new_tat - period - now
+        cache.set(key, new_tat, timeout=math.ceil((new_tat - now) / MICROSECOND))
+        return 0
+
+
+def gcra_update(cache, key, now, interval, period):
+    """
+    Spends one token from the bucket at `key` and returns 0, or returns the
+    microseconds until a token is available, leaving the bucket untouched.
+    """
+    if isinstance(cache, RedisCache):
+        return _redis_update(cache, key, now, interval, period)
+    if isinstance(cache, LocMemCache):
+        return _local_update(cache, key, now, interval, period)
+    raise ImproperlyConfigured(
+        f'{type(cache).__name__} has no atomic update; throttle with a Redis or local-memory cache.'
+    )
+
+
+"""  Throttle  """
+class GCRAThrottle(BaseThrottle):
+    """
+    Token-bucket limits from DEFAULT_THROTTLE_RATES, keyed by user id (or by
+    client IP when anonymous). A view picks its own rate with `throttle_scope`,
+    either one scope or a {method: scope} dict; otherwise the 'user' or 'anon'
+    rate applies. A rate of N/period allows a burst of N requests, then one
+    every period / N.
+    """
+    cache_alias = 'throttle'
+    timer = time.time
+
+    def __init__(self):
+        self.delay = 0
+
+    def get_scope(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if isinstance(scope, dict):
+            scope = scope.get(request.method)
+        return scope or ('user' if request.user.is_authenticated else 'anon')
+
+    def get_cache(self):
+        return caches[self.cache_alias]
+
+    def get_cache_key(self, request, scope):
+        if request.user.is_authenticated:
+            return f'throttle_{scope}_user_{request.user.pk}'
+        return f'throttle_{scope}_anon_{self.get_ident(request)}'
+
+    def get_rate(self, scope):
+        try:
+            return api_settings.DEFAULT_THROTTLE_RATES[scope]
+        except KeyError:
+            raise ImproperlyConfigured(f"No default throttle rate set for '{scope}' scope")
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(request, view)
+        rate = self.get_rate(scope)
+        if rate is None:
+            return True
+
+        num_requests, duration = parse_rate(rate)
+        self.delay = gcra_update(
+            self.get_cache(),
+            self.get_cache_key(request, scope),
+            int(self.timer() * MICROSECOND),
+            duration * MICROSECOND // num_requests,
+            duration * MICROSECOND,
+        )
+        return self.delay == 0
+
+    def wait(self):
+        return self.delay / MICROSECOND
@@ -0,0 +1,60 @@
+"""
+JWTs carrying the user's roles.
+
+Access tokens are signed with a `roles` claim (group names, 'staff', or
+'customer' for users in no group) and the user's token version `ver`, so
+permission checks read the token instead of the database. Removing someone
+from a group (or their staff status) bumps the version; tokens issued before
+that are refused until the client refreshes, and refreshing re-reads the roles.
+Versions are cached in the 'auth' cache, so with REDIS_URL set every worker
+refuses them at once, and within AUTH_CACHE_TIMEOUT seconds otherwise.
+"""
+
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenBlacklistSerializer, TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from .authentication import get_user
+from .blacklist import is_blacklisted
+from .roles import ROLES_CLAIM, VERSION_CLAIM, role_claims
+
+
+class RoleAccessToken(AccessToken):
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token.payload.update(role_claims(user))
+        return token
+
+
+class RoleRefreshToken(RefreshToken):
+    access_token_class = RoleAccessToken
+    no_copy_claims = (*RefreshToken.no_copy_claims, ROLES_CLAIM, VERSION_CLAIM)
+
+    @property
+    def access_token(self):
+        # Roles are looked up for each access token, never copied from the refresh token
+        access = super().access_token
+        user = get_user(self[jwt_settings.USER_ID_CLAIM])
+        if user is not None:
+            access.payload.update(role_claims(user))
+        return access
+
+    def check_blacklist(self):
+        # Through the in-memory filter (blacklist.py) rather than a join per token
+        if is_blacklisted(self.payload[jwt_settings.JTI_CLAIM]):
+            raise TokenError(_('Token is blacklisted'))
+
+
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = RoleRefreshToken
+
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = RoleRefreshToken
+
+
+class RoleTokenBlacklistSerializer(TokenBlacklistSerializer):
+    token_class = RoleRefreshToken
@@ -1,24 +1,47 @@
 from django.urls import path 
 from . import views 
-from rest_framework.authtoken.views import obtain_auth_token
+from . import async_views
+from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework_simplejwt.views import TokenBlacklistView
+from .renderers import MessagePackRenderer
+from .parsers import MessagePackParser
+
+# DRF's token view pins JSON; let it speak MessagePack like the rest of the API
+obtain_auth_token = ObtainAuthToken.as_view(
+    renderer_classes=[*ObtainAuthToken.renderer_classes, MessagePackRenderer],
+    parser_classes=[*ObtainAuthToken.parser_classes, MessagePackParser],
+)
   
 urlpatterns = [ 
-    path('menu-items/', views.MenuItemView.as_view()), 
-    path('menu-item/<int:pk>', views.SingleMenuItemView.as_view()),
-    path('groups/manager/users', views.ManagerView.as_view()),
-    path('groups/manager/users/<int:pk>', views.ManagerViewDelete.as_view()),
-    path('groups/delivery-crew/users', views.DeliveryCrewView.as_view()),
-    path('groups/delivery-crew/users/<int:pk>', views.DeliveryCrewViewDelete.as_view()),
-    path('cart/menu-items', views.CartView.as_view()),
-    path('cart/menu-items/<int:pk>', views.ClearCartView.as_view()),
-    path('orders/', views.OrderViewPost.as_view()),
-    path('orders/<int:order_id>', views.OrderViewUpdate.as_view()),
-    path('category/', views.CategoryView.as_view()),
-    path('itemofday/', views.ItemOfDayView.as_view()),
-    path('api-token-auth/', obtain_auth_token),
+    path('menu-items/', views.MenuItemView.as_view(), name='menu_items'), 
+    path('menu-item/<int:pk>', views.SingleMenuItemView.as_view(), name='menu_item'),
+    path('menu-items/import', views.MenuItemImportView.as_view(), name='menu_items_import'),
+    path('menu-items/export.<str:fmt>', views.MenuItemExportView.as_view(), name='menu_items_export'),
+    path('groups/manager/users', views.ManagerView.as_view(), name='manager_users'),
+    path('groups/manager/users/<int:pk>', views.ManagerViewDelete.as_view(), name='manager_user'),
+    path('groups/delivery-crew/users', views.DeliveryCrewView.as_view(), name='delivery_crew_users'),
+    path('groups/delivery-crew/users/<int:pk>', views.DeliveryCrewViewDelete.as_view(), name='delivery_crew_user'),
+    path('cart/menu-items', views.CartView.as_view(), name='cart'),
+    path('cart/menu-items/<int:pk>', views.ClearCartView.as_view(), name='cart_item'),
+    path('orders/', views.OrderViewPost.as_view(), name='orders'),
+    path('orders/<int:order_id>', views.OrderViewUpdate.as_view(), name='order'),
+    path('orders/changes', views.OrderChangesView.as_view(), name='order_changes'),
+    path('orders/assign', views.OrderAssignView.as_view(), name='orders_assign'),
+    path('orders/claim', views.OrderClaimView.as_view(), name='order_claim'),
+    path('orders/export.<str:fmt>', views.OrderExportView.as_view(), name='orders_export'),
+    path('category/', views.CategoryView.as_view(), name='categories'),
+    path('itemofday/', views.ItemOfDayView.as_view(), name='item_of_day'),
+    path('api-token-auth/', obtain_auth_token, name='api_token_auth'),
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('token/blacklist/', TokenBlacklistView.as_view(), name='token_blacklist'),
+    path('async/menu-items/', async_views.AsyncMenuItemView.as_view(), name='async_menu_items'),
+    path('async/menu-item/<int:pk>', async_views.AsyncSingleMenuItemView.as_view(), name='async_menu_item'),
+    path('async/category/', async_views.AsyncCategoryView.as_view(), name='async_categories'),
+    path('async/itemofday/', async_views.AsyncItemOfDayView.as_view(), name='async_item_of_day'),
+    path('async/cart/menu-items', async_views.AsyncCartView.as_view(), name='async_cart'),
+    path('async/orders/', async_views.AsyncOrderView.as_view(), name='async_orders'),
+    path('async/orders/stream', async_views.AsyncOrderStreamView.as_view(), name='async_order_stream'),
+    path('async/orders/<int:order_id>', async_views.AsyncOrderDetailView.as_view(), name='async_order'),
 ] 
\ No newline at end of file
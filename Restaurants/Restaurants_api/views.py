@@ -1,11 +1,11 @@
-from .models import MenuItem, Cart, OrderItem, Order, Category
-from .serializers import MenuItemSerializer, CartSerializer, OrderItemSerializer, OrderSerializer, CategorySerializer
+from .models import MenuItem, Cart, Order, OrderEvent, Category
+from .serializers import MenuItemSerializer, CartSerializer, CartLineSerializer, OrderItemSerializer, OrderSerializer, CategorySerializer, BulkAssignSerializer
 from django.contrib.auth.models import User, Group
 from django.shortcuts import get_object_or_404
 from django.core.paginator import Paginator, EmptyPage
 from rest_framework.pagination import PageNumberPagination
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import generics, permissions, status, viewsets, filters, serializers
+from rest_framework import generics, permissions, status, viewsets, serializers
 from rest_framework import status
 from rest_framework.decorators import api_view, APIView, permission_classes, renderer_classes, throttle_classes
 from rest_framework.permissions import IsAdminUser, IsAuthenticated, BasePermission
@@ -16,29 +16,49 @@ from rest_framework.throttling import UserRateThrottle
 from rest_framework import viewsets
 from rest_framework.renderers import TemplateHTMLRenderer
 from decimal import Decimal
-from datetime import date
-from drf_yasg.utils import swagger_auto_schema
+from drf_yasg.utils import swagger_auto_schema, no_body
 from drf_yasg import openapi
+from .roles import MANAGER, DELIVERY_CREW, STAFF, CUSTOMER, has_role, request_roles
+from .pagination import KeysetPagination, CursorPaginationMixin
+from .response_cache import cache_catalogue_response, bump_version
+from .cart import add_to_cart, MAX_CART_BATCH
+from .checkout import place_order
+from .dispatch import claim_order, assign_orders, balance_orders, MAX_ASSIGN_BATCH
+from .conditional import conditional_get, catalogue_view_validators, order_validators, CATALOGUE_CACHE_CONTROL, ORDER_CACHE_CONTROL
+from django.utils import timezone
+from django.db import transaction
+from django.http import StreamingHttpResponse, Http404
+from rest_framework.exceptions import NotFound, UnsupportedMediaType
+from .menu_io import FORMATS, UnreadableInput, format_for_content_type, read_rows, text_lines, import_menu_items, export_menu_items
+from .order_export import OrderExportFilter, export_orders
+from .throttles import MENU_READS
+from .search import MenuItemSearchFilter, RankOrderingFilter
+from .menu_filters import MenuItemFilter
+from . import metrics, order_events
+from django.http import HttpResponse
+from django.conf import settings
+from .read_serializers import ReadSerializerMixin, CategoryReadSerializer, MenuItemReadSerializer, CartReadSerializer, OrderReadSerializer
 
 
 
 
 """  Creating Permisiions  """
+# Each reads the JWT's role claims when it has them (see tokens.py)
 class IsManager(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.groups.filter(name='Manager').exists()
+        return MANAGER in request_roles(request)
 
 class IsDeliveryCrew(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.groups.filter(name='DeliveryCrew').exists()
+        return DELIVERY_CREW in request_roles(request)
 
 class IsCustomer(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.groups.count() == 0 
+        return CUSTOMER in request_roles(request)
     
 class IsAdminOrManager(BasePermission):
     def has_permission(self, request, view):
-        return bool(request.user and request.user.is_authenticated and (request.user.is_staff or request.user.groups.filter(name='Manager').exists()))
+        return bool(request.user and request.user.is_authenticated and request_roles(request) & {STAFF, MANAGER})
 
 
 
@@ -321,6 +341,7 @@ class DeliveryCrewViewDelete(APIView):
 
 """  Item of the Day  """
 class ItemOfDayView(APIView):
+    throttle_scope = MENU_READS
 
     def get_permissions(self):
         if self.request.method == 'GET':
@@ -375,7 +396,8 @@ class ItemOfDayView(APIView):
         item_id = request.data.get('item_id')     
         if not item_id:
             return Response({"error": "Menu item ID is required"}, status=status.HTTP_400_BAD_REQUEST)      
-        MenuItem.objects.filter(featured=True).update(featured=False)
+        MenuItem.objects.filter(featured=True).update(featured=False, updated_at=timezone.now())
+        bump_version()    # update() skips the post_save signal
         
         try:
             menu_item = MenuItem.objects.get(id=item_id)
@@ -412,6 +434,8 @@ class ItemOfDayView(APIView):
         tags=['Featured Items'],
         security=[{'Bearer': []}]
     )
+    @conditional_get(catalogue_view_validators, CATALOGUE_CACHE_CONTROL)
+    @cache_catalogue_response
     def get(self, request):
         try:
             item = MenuItem.objects.get(featured=True)
@@ -426,9 +450,11 @@ class ItemOfDayView(APIView):
 
 
 """  CRUD Categories for Admin and View Categories for users  """
-class CategoryView(generics.ListCreateAPIView):
+class CategoryView(ReadSerializerMixin, generics.ListCreateAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    read_serializer_class = CategoryReadSerializer
+    throttle_scope = MENU_READS
 
     @swagger_auto_schema(
         operation_description="Get list of all categories",
@@ -441,6 +467,7 @@ class CategoryView(generics.ListCreateAPIView):
         },
         tags=['Categories']
     )
+    @cache_catalogue_response
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
     
@@ -485,25 +512,38 @@ class MenuItemPagination(PageNumberPagination):
     page_size_query_param = 'perpage'  
     max_page_size = 100  
 
-class MenuItemView(generics.ListCreateAPIView):
+class MenuItemCursorPagination(KeysetPagination):
+    page_size = 5
+    ordering = ('id',)
+
+class MenuItemView(ReadSerializerMixin, CursorPaginationMixin, generics.ListCreateAPIView):
     queryset = MenuItem.objects.all()
     serializer_class = MenuItemSerializer
+    read_serializer_class = MenuItemReadSerializer
     pagination_class = MenuItemPagination  
+    cursor_pagination_class = MenuItemCursorPagination
+    throttle_scope = MENU_READS
 
-    filter_backends = [filters.OrderingFilter, DjangoFilterBackend]
-    filterset_fields = ['category', 'price']
+    filter_backends = [MenuItemSearchFilter, RankOrderingFilter, DjangoFilterBackend]
+    filterset_class = MenuItemFilter
     ordering_fields = ['price']
 
     @swagger_auto_schema(
-        operation_description="Get list of menu items with pagination, filtering and ordering",
+        operation_description="Get list of menu items with pagination, filtering, ordering and search",
         operation_summary="List Menu Items", 
         manual_parameters=[
             openapi.Parameter('page', openapi.IN_QUERY, description="Page number", type=openapi.TYPE_INTEGER),
             openapi.Parameter('perpage', openapi.IN_QUERY, description="Items per page (max 100)", type=openapi.TYPE_INTEGER),
-            openapi.Parameter('category', openapi.IN_QUERY, description="Filter by category ID", type=openapi.TYPE_INTEGER),
-            openapi.Parameter('category_slug', openapi.IN_QUERY, description="Filter by category slug", type=openapi.TYPE_STRING),
+            openapi.Parameter('category', openapi.IN_QUERY, description="Filter by category ID (comma-separated for several)", type=openapi.TYPE_STRING),
+            openapi.Parameter('category_slug', openapi.IN_QUERY, description="Filter by category slug (comma-separated for several)", type=openapi.TYPE_STRING),
             openapi.Parameter('price', openapi.IN_QUERY, description="Filter by exact price", type=openapi.TYPE_NUMBER),
-            openapi.Parameter('ordering', openapi.IN_QUERY, description="Order by price (use -price for descending)", type=openapi.TYPE_STRING)
+            openapi.Parameter('min_price', openapi.IN_QUERY, description="Lowest price, inclusive", type=openapi.TYPE_NUMBER),
+            openapi.Parameter('max_price', openapi.IN_QUERY, description="Highest price, inclusive", type=openapi.TYPE_NUMBER),
+            openapi.Parameter('featured', openapi.IN_QUERY, description="Only featured (true) or non-featured (false) items", type=openapi.TYPE_BOOLEAN),
+            openapi.Parameter('search', openapi.IN_QUERY, description="Search titles, best match first; tolerates typos and matches word prefixes", type=openapi.TYPE_STRING),
+            openapi.Parameter('ordering', openapi.IN_QUERY, description="Order by price (use -price for descending); overrides the search ranking", type=openapi.TYPE_STRING),
+            openapi.Parameter('pagination', openapi.IN_QUERY, description="Use 'cursor' for keyset pagination (next/previous links instead of page numbers)", type=openapi.TYPE_STRING),
+            openapi.Parameter('cursor', openapi.IN_QUERY, description="Opaque cursor taken from a next/previous link", type=openapi.TYPE_STRING)
         ],
         responses={
             200: openapi.Response(
@@ -527,6 +567,8 @@ class MenuItemView(generics.ListCreateAPIView):
         },
         tags=['Menu Items']
     )
+    @conditional_get(catalogue_view_validators, CATALOGUE_CACHE_CONTROL)
+    @cache_catalogue_response
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
 
@@ -558,17 +600,6 @@ class MenuItemView(generics.ListCreateAPIView):
     def post(self, request, *args, **kwargs):
         return super().post(request, *args, **kwargs)
 
-    def get_queryset(self):
-        queryset = MenuItem.objects.all()
-        to_price = self.request.query_params.get('price')
-        category_slug = self.request.query_params.get('category_slug')
-
-        if category_slug:
-            queryset = queryset.filter(category__slug=category_slug)
-        if to_price:
-            queryset = queryset.filter(price=to_price)
-        return queryset
-
     def get_permissions(self):
         if self.request.method == 'POST':
             return [IsAdminOrManager()]
@@ -580,6 +611,7 @@ class MenuItemView(generics.ListCreateAPIView):
 class SingleMenuItemView(generics.RetrieveUpdateDestroyAPIView):
     queryset = MenuItem.objects.all()
     serializer_class = MenuItemSerializer
+    throttle_scope = MENU_READS
 
     @swagger_auto_schema(
         operation_description="Get details of a specific menu item",
@@ -596,6 +628,7 @@ class SingleMenuItemView(generics.RetrieveUpdateDestroyAPIView):
         },
         tags=['Menu Items']
     )
+    @cache_catalogue_response
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
     
@@ -697,9 +730,101 @@ class SingleMenuItemView(generics.RetrieveUpdateDestroyAPIView):
 
 
 
+"""  Bulk Import/Export of Menu Items by Manager  """
+class MenuItemImportView(APIView):
+    permission_classes = [IsAdminOrManager]
+
+    @swagger_auto_schema(
+        operation_description="Create or update menu items from a CSV or NDJSON body (columns/keys: id, title, price, featured, category). "
+                              "Rows with an id update that item, others are created; category is a slug. The body is read as a stream "
+                              "and written in batches, invalid rows are reported by line and skipped.",
+        operation_summary="Bulk Import Menu Items",
+        consumes=list(FORMATS.values()),
+        responses={
+            200: openapi.Response(
+                description="Import report",
+                examples={
+                    "application/json": {
+                        "created": 120,
+                        "updated": 4,
+                        "error_count": 1,
+                        "errors": [{"line": 7, "errors": {"price": ["price less than 2.00"]}}]
+                    }
+                }
+            ),
+            400: openapi.Response(
+                description="Body is not valid UTF-8 or CSV from the reported line on; the rows before it are imported",
+                examples={
+                    "application/json": {
+                        "created": 5,
+                        "updated": 0,
+                        "error_count": 1,
+                        "errors": [{"line": 7, "errors": {"non_field_errors": ["Invalid UTF-8."]}}]
+                    }
+                }
+            ),
+            403: openapi.Response(
+                description="Admin or Manager permission required",
+                examples={"application/json": {"detail": "You do not have permission to perform this action."}}
+            ),
+            415: openapi.Response(
+                description="Body is neither CSV nor NDJSON",
+                examples={"application/json": {"detail": "Unsupported media type \"application/json\" in request."}}
+            )
+        },
+        tags=['Menu Items'],
+        security=[{'Bearer': []}]
+    )
+    def post(self, request):
+        fmt = format_for_content_type(request.content_type)
+        if fmt is None:
+            raise UnsupportedMediaType(request.content_type)
+        if request.stream is None:
+            return Response({"message": "Request body is empty"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            report = import_menu_items(read_rows(text_lines(request.stream), fmt))
+        except UnreadableInput as exc:
+            return Response(exc.report, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report, status=status.HTTP_200_OK)
+
+
+class MenuItemExportView(APIView):
+    permission_classes = [IsAdminOrManager]
+
+    @swagger_auto_schema(
+        operation_description="Stream every menu item as CSV or NDJSON, in the format accepted by the import endpoint",
+        operation_summary="Export Menu Items",
+        manual_parameters=[
+            openapi.Parameter('fmt', openapi.IN_PATH, description="csv or ndjson", type=openapi.TYPE_STRING, required=True, enum=list(FORMATS))
+        ],
+        responses={
+            200: openapi.Response(description="Menu items, one per line"),
+            403: openapi.Response(
+                description="Admin or Manager permission required",
+                examples={"application/json": {"detail": "You do not have permission to perform this action."}}
+            ),
+            404: openapi.Response(description="Unknown export format", examples={"application/json": {"detail": "Not found."}})
+        },
+        tags=['Menu Items'],
+        security=[{'Bearer': []}]
+    )
+    def get(self, request, fmt):
+        if fmt not in FORMATS:
+            raise Http404
+        response = StreamingHttpResponse(export_menu_items(fmt), content_type=FORMATS[fmt])
+        response['Content-Disposition'] = f'attachment; filename="menu-items.{fmt}"'
+        return response
+
+    def perform_content_negotiation(self, request, force=False):
+        # The body is CSV/NDJSON whatever the Accept header says
+        return super().perform_content_negotiation(request, force=True)
+
+
+
 """  Cart View & Post  """
-class CartView(generics.ListCreateAPIView):
+class CartView(ReadSerializerMixin, generics.ListCreateAPIView):
     serializer_class = CartSerializer
+    read_serializer_class = CartReadSerializer
     permission_classes = [IsAuthenticated, IsCustomer]
 
     @swagger_auto_schema(
@@ -726,12 +851,12 @@ class CartView(generics.ListCreateAPIView):
         return super().get(request, *args, **kwargs)
 
     @swagger_auto_schema(
-        operation_description="Add item to cart",
         operation_summary="Add to Cart",
+        operation_description="Add one item ({menuitem, quantity}) or a list of them. Items already in the cart have their quantity increased. A list returns the updated cart.",
         request_body=CartSerializer,
         responses={
             201: openapi.Response(
-                description="Item added to cart",
+                description="Item(s) added to cart",
                 schema=CartSerializer
             ),
             400: openapi.Response(
@@ -751,7 +876,18 @@ class CartView(generics.ListCreateAPIView):
         security=[{'Bearer': []}]
     )
     def post(self, request, *args, **kwargs):
-        return super().post(request, *args, **kwargs)
+        many = isinstance(request.data, list)
+        if many and len(request.data) > MAX_CART_BATCH:
+            return Response({"error": f"At most {MAX_CART_BATCH} items per request"}, status=status.HTTP_400_BAD_REQUEST)
+        lines = CartLineSerializer(data=request.data, many=many)
+        lines.is_valid(raise_exception=True)
+        entries = lines.validated_data if many else [lines.validated_data]
+
+        menuitems = add_to_cart(request.user, [(entry['menuitem'], entry['quantity']) for entry in entries])
+        cart = self.get_queryset()
+        if many:
+            return Response(CartSerializer(cart, many=True).data, status=status.HTTP_201_CREATED)
+        return Response(CartSerializer(cart.get(menuitem_id=menuitems[0])).data, status=status.HTTP_201_CREATED)
 
     @swagger_auto_schema(
         operation_description="Clear all items from user's cart",
@@ -777,9 +913,6 @@ class CartView(generics.ListCreateAPIView):
     def get_queryset(self):
         return Cart.objects.filter(user=self.request.user)
 
-    def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
-
     
 
 
@@ -827,8 +960,13 @@ class ClearCartView(APIView):
 
 
 """  Order view for Customer, all order view for Manager, assigned view for Crew. Place order by Customer  """
-class OrderViewPost(generics.ListCreateAPIView):
+class OrderCursorPagination(KeysetPagination):
+    ordering = ('-id',)
+
+class OrderViewPost(CursorPaginationMixin, generics.ListCreateAPIView):
     serializer_class = OrderSerializer
+    cursor_pagination_class = OrderCursorPagination
+    throttle_scope = {'POST': 'checkout'}
 
     @swagger_auto_schema(
         operation_description="""
@@ -839,6 +977,11 @@ class OrderViewPost(generics.ListCreateAPIView):
         """,        
         operation_summary="Get Order Items",
         tags=['Orders'],
+        manual_parameters=[
+            openapi.Parameter('pagination', openapi.IN_QUERY, description="Use 'cursor' to page through orders, newest first", type=openapi.TYPE_STRING),
+            openapi.Parameter('perpage', openapi.IN_QUERY, description="Orders per page in cursor mode (max 100)", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('cursor', openapi.IN_QUERY, description="Opaque cursor taken from a next/previous link", type=openapi.TYPE_STRING)
+        ],
         responses={
             200: openapi.Response(
                 description="Successfully retrieved orders",
@@ -911,14 +1054,20 @@ class OrderViewPost(generics.ListCreateAPIView):
         security=[{'Bearer': []}]
     )
     def get(self, request):
-        if request.user.groups.filter(name='Manager').exists():
+        if has_role(request.user, MANAGER):
             queryset = Order.objects.all()
-        elif request.user.groups.filter(name='DeliveryCrew').exists():
+        elif has_role(request.user, DELIVERY_CREW):
             queryset = Order.objects.filter(delivery_crew=request.user)
         else:
             queryset = Order.objects.filter(user=request.user)
-        
-        serializer = OrderSerializer(queryset, many=True)
+        queryset = OrderReadSerializer.values(queryset)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = OrderReadSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = OrderReadSerializer(queryset, many=True)
         return Response(serializer.data)
             
     
@@ -1007,20 +1156,9 @@ class OrderViewPost(generics.ListCreateAPIView):
         security=[{'Bearer': []}]
     )
     def post(self, request):
-        user = request.user
-        cart_items = Cart.objects.filter(user=user)
-        if not cart_items.exists():
+        order = place_order(request.user)
+        if order is None:
             return Response({"error": "Cart is empty"}, status=status.HTTP_400_BAD_REQUEST)
-
-        total = sum(item.price for item in cart_items)
-        order = Order.objects.create(user=user, total=total, date=date.today())
-
-        order_items = [
-            OrderItem(order=order, menuitem=item.menuitem, quantity=item.quantity, unit_price=item.unit_price, total_price=item.price)
-            for item in cart_items
-        ]
-        OrderItem.objects.bulk_create(order_items)
-        cart_items.delete()
         return Response({"message": "Order placed successfully"}, status=status.HTTP_201_CREATED)
     
     def get_permissions(self):
@@ -1029,6 +1167,104 @@ class OrderViewPost(generics.ListCreateAPIView):
         return [IsAuthenticated()]
 
 
+"""  Order change feed  """
+class OrderChangesView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="Order Changes Since Cursor",
+        operation_description=f"""
+        Changes to the orders visible to you, oldest first, after `since` (omit it to start from the beginning).
+
+        - **Customer**: changes to their own orders
+        - **Manager**: changes to every order
+        - **Delivery Crew**: changes to the orders assigned to them
+
+        Each change is an order being `created`, `assigned` (with the crew member's id) or `delivered`.
+        Up to {order_events.FEED_LIMIT} changes per response; pass the returned `cursor` as `since` on the next poll.
+        `more` is true when further changes are already waiting.
+        """,
+        tags=['Orders'],
+        manual_parameters=[
+            openapi.Parameter('since', openapi.IN_QUERY, description="Cursor from the previous response", type=openapi.TYPE_STRING)
+        ],
+        responses={
+            200: openapi.Response(
+                description="Changes after the cursor",
+                examples={"application/json": {
+                    "changes": [{"id": 41, "order": 7, "event": "assigned", "delivery_crew": 3, "at": "2024-01-15T12:30:00Z"}],
+                    "cursor": "41",
+                    "more": False
+                }}
+            ),
+            400: openapi.Response(
+                description="Invalid cursor",
+                examples={"application/json": {"error": "Invalid cursor"}}
+            ),
+            401: openapi.Response(
+                description="Authentication required",
+                examples={"application/json": {"detail": "Authentication credentials were not provided."}}
+            )
+        },
+        security=[{'Bearer': []}]
+    )
+    def get(self, request):
+        since = request.query_params.get('since') or '0'
+        if not (since.isascii() and since.isdigit() and len(since) <= 18):     # fits a bigint
+            return Response({"error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+        rows, more = order_events.changes_since(request.user, int(since))
+        return Response({
+            'changes': [order_events.event_data(row) for row in rows],
+            'cursor': str(rows[-1]['id']) if rows else since,
+            'more': more,
+        })
+
+
+"""  Streaming Order Export for Manager  """
+class OrderExportView(APIView):
+    permission_classes = [IsAdminOrManager]
+
+    @swagger_auto_schema(
+        operation_description="Stream orders as NDJSON (one order per line, items nested) or CSV (one line per order item). "
+                              "Rows are read from a server-side cursor in chunks, so memory stays flat however many orders match.",
+        operation_summary="Export Orders",
+        manual_parameters=[
+            openapi.Parameter('fmt', openapi.IN_PATH, description="csv or ndjson", type=openapi.TYPE_STRING, required=True, enum=list(FORMATS)),
+            openapi.Parameter('date_from', openapi.IN_QUERY, description="Orders on or after this date (YYYY-MM-DD)", type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE),
+            openapi.Parameter('date_to', openapi.IN_QUERY, description="Orders on or before this date (YYYY-MM-DD)", type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE),
+            openapi.Parameter('status', openapi.IN_QUERY, description="true for delivered orders, false for pending ones", type=openapi.TYPE_BOOLEAN),
+        ],
+        responses={
+            200: openapi.Response(description="Orders, one per line"),
+            400: openapi.Response(
+                description="Invalid filter",
+                examples={"application/json": {"date_from": ["Enter a valid date."]}}
+            ),
+            403: openapi.Response(
+                description="Admin or Manager permission required",
+                examples={"application/json": {"detail": "You do not have permission to perform this action."}}
+            ),
+            404: openapi.Response(description="Unknown export format", examples={"application/json": {"detail": "Not found."}})
+        },
+        tags=['Orders'],
+        security=[{'Bearer': []}]
+    )
+    def get(self, request, fmt):
+        if fmt not in FORMATS:
+            raise Http404
+        filterset = OrderExportFilter(request.query_params, queryset=Order.objects.all())
+        if not filterset.is_valid():
+            raise serializers.ValidationError(filterset.errors)
+        response = StreamingHttpResponse(export_orders(filterset.qs, fmt), content_type=FORMATS[fmt])
+        response['Content-Disposition'] = f'attachment; filename="orders.{fmt}"'
+        return response
+
+    def perform_content_negotiation(self, request, force=False):
+        # The body is CSV/NDJSON whatever the Accept header says
+        return super().perform_content_negotiation(request, force=True)
+
+
+
 """  Order Status Update by Crew & Manager and View by Customer  """
 class OrderViewUpdate(generics.RetrieveUpdateAPIView):
     serializer_class = OrderSerializer
@@ -1040,8 +1276,10 @@ class OrderViewUpdate(generics.RetrieveUpdateAPIView):
     def get_object(self):
         order_id = self.kwargs['order_id']
         if self.request.method == 'GET':
-            if not self.request.user.groups.filter(name__in=['Manager', 'DeliveryCrew']).exists():
-                return get_object_or_404(Order, id=order_id, user=self.request.user)
+            queryset = Order.objects.with_details()
+            if not (has_role(self.request.user, MANAGER) or has_role(self.request.user, DELIVERY_CREW)):
+                return get_object_or_404(queryset, id=order_id, user=self.request.user)
+            return get_object_or_404(queryset, id=order_id)
         return get_object_or_404(Order, id=order_id)
     
     def get_permissions(self):
@@ -1146,6 +1384,7 @@ class OrderViewUpdate(generics.RetrieveUpdateAPIView):
         },
         security=[{'Bearer': []}]
     )
+    @conditional_get(order_validators, ORDER_CACHE_CONTROL)
     def get(self, request, order_id):
         order = self.get_object()
         serializer = self.get_serializer(order)
@@ -1251,11 +1490,13 @@ class OrderViewUpdate(generics.RetrieveUpdateAPIView):
     def patch(self, request, order_id):
         order = self.get_object()
         
-        if request.user.groups.filter(name='DeliveryCrew').exists() and order.delivery_crew != request.user:
+        if has_role(request.user, DELIVERY_CREW) and order.delivery_crew != request.user:
             return Response({"error": "You can only update orders assigned to you"}, status=status.HTTP_403_FORBIDDEN)
             
-        order.status = True
-        order.save()
+        with transaction.atomic():
+            order.status = True
+            order.save()
+            order_events.record(OrderEvent.DELIVERED, [(order.id, order.user_id, order.delivery_crew_id)])
         return Response({"message": "Order marked as delivered"}, status=status.HTTP_200_OK)
     
     @swagger_auto_schema(
@@ -1390,6 +1631,122 @@ class OrderViewUpdate(generics.RetrieveUpdateAPIView):
             return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
             
         order = self.get_object()
-        order.delivery_crew = user
-        order.save()
-        return Response({"message": "Order assigned successfully"}, status=status.HTTP_200_OK)
\ No newline at end of file
+        with transaction.atomic():
+            order.delivery_crew = user
+            order.save()
+            order_events.record(OrderEvent.ASSIGNED, [(order.id, order.user_id, user.id)])
+        return Response({"message": "Order assigned successfully"}, status=status.HTTP_200_OK)
+
+
+
+"""  Bulk order assignment for Managers  """
+class OrderAssignView(APIView):
+    permission_classes = [IsManager]
+
+    @swagger_auto_schema(
+        operation_summary="Assign Orders in Bulk",
+        operation_description=f"""
+        Assign up to {MAX_ASSIGN_BATCH} orders to delivery crew in one request (Manager only).
+
+        - **assignments**: explicit `{{order, username}}` pairs
+        - **orders**: order IDs to spread over the delivery crew, each going to whoever has the
+          fewest open orders; `usernames` limits the pool to those crew members
+
+        The whole batch is applied or, on any unknown or delivered order or unknown crew member, none of it.
+        """,
+        tags=['Orders'],
+        request_body=BulkAssignSerializer,
+        responses={
+            200: openapi.Response(
+                description="Orders assigned",
+                examples={"application/json": {"assignments": [{"order": 1, "username": "crew_member_1"}]}}
+            ),
+            400: openapi.Response(
+                description="Invalid batch, unknown or delivered order, or not a delivery crew member",
+                examples={"application/json": {"username": ['"someone" is not a delivery crew member.']}}
+            ),
+            403: openapi.Response(
+                description="Manager permission required",
+                examples={"application/json": {"detail": "You do not have permission to perform this action."}}
+            )
+        },
+        security=[{'Bearer': []}]
+    )
+    def post(self, request):
+        batch = BulkAssignSerializer(data=request.data)
+        batch.is_valid(raise_exception=True)
+        data = batch.validated_data
+        if 'assignments' in data:
+            assigned = assign_orders({entry['order']: entry['username'] for entry in data['assignments']})
+        else:
+            assigned = balance_orders(data['orders'], data.get('usernames'))
+        return Response({
+            'assignments': [{'order': order_id, 'username': username} for order_id, username in sorted(assigned.items())]
+        }, status=status.HTTP_200_OK)
+
+
+"""  Delivery crew claims the next order  """
+class OrderClaimView(APIView):
+    permission_classes = [IsDeliveryCrew]
+
+    @swagger_auto_schema(
+        operation_summary="Claim Next Order",
+        operation_description="""
+        Assign the oldest open, unassigned order to the requesting delivery crew member (Delivery Crew only).
+
+        Parallel claims never wait on each other and never receive the same order.
+        Returns the claimed order, or 204 when no order is waiting.
+        """,
+        tags=['Orders'],
+        request_body=no_body,
+        responses={
+            200: openapi.Response(description="The order now assigned to you", schema=OrderSerializer),
+            204: openapi.Response(description="No unassigned orders"),
+            403: openapi.Response(
+                description="Delivery crew permission required",
+                examples={"application/json": {"detail": "You do not have permission to perform this action."}}
+            )
+        },
+        security=[{'Bearer': []}]
+    )
+    def post(self, request):
+        order_id = claim_order(request.user)
+        if order_id is None:
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        row = OrderReadSerializer.values(Order.objects.filter(id=order_id)).get()
+        return Response(OrderReadSerializer(row).data, status=status.HTTP_200_OK)
+
+
+
+
+"""  Prometheus metrics for Admin  """
+class MetricsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description="Request counts, error counts, latency and DB query histograms by URL name and method, "
+                              "summed over every worker process on this host, in Prometheus text format",
+        operation_summary="Prometheus Metrics",
+        responses={
+            200: openapi.Response(description="Prometheus text exposition format 0.0.4"),
+            403: openapi.Response(
+                description="Admin permission required",
+                examples={"application/json": {"detail": "You do not have permission to perform this action."}}
+            ),
+            404: openapi.Response(
+                description="Request metrics are off (no METRICS_DIR)",
+                examples={"application/json": {"detail": "Request metrics are off."}}
+            )
+        },
+        tags=['Monitoring'],
+        security=[{'Bearer': []}]
+    )
+    def get(self, request):
+        if not settings.REQUEST_METRICS:
+            raise NotFound('Request metrics are off.')
+        metrics.get_registry().flush()     # include this process's latest counts
+        return HttpResponse(metrics.render_prometheus(metrics.collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+    def perform_content_negotiation(self, request, force=False):
+        # Always the text format, whatever the scraper's Accept header says
+        return super().perform_content_negotiation(request, force=True)